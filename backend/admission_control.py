@@ -0,0 +1,224 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status and wait hint."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        """Response headers telling the client when to retry."""
+        seconds = str(max(1, math.ceil(self.retry_after)))
+        return {"Retry-After": seconds, "X-Estimated-Wait": seconds}
+
+
+class AdmissionController:
+    """
+    Caps concurrent transcriptions with a bounded wait queue and per-user limits.
+    Live streams count toward the user's quota while open, and each of their
+    decoding steps waits for a slot like an upload does. All counters live in
+    this process, so every limit applies per worker.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 1,
+        max_queue: int = 8,
+        max_wait_seconds: float = 120.0,
+        per_user_limit: int = 2,
+        rate_limit: int = 10,
+        rate_window_seconds: float = 60.0,
+        max_streams: int = 4,
+        default_duration: float = 20.0,
+        default_step_duration: float = 2.0,
+        history_size: int = 20
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.per_user_limit = per_user_limit
+        self.rate_limit = rate_limit
+        self.rate_window_seconds = rate_window_seconds
+        self.max_streams = max_streams
+        self.default_duration = default_duration
+        self.default_step_duration = default_step_duration
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._waiting = 0
+        self._waiting_steps = 0
+        self._streams = 0
+        self._user_inflight: Dict[str, int] = {}
+        self._user_requests: Dict[str, Deque[float]] = {}
+        self._durations: Deque[float] = deque(maxlen=history_size)
+        self._step_durations: Deque[float] = deque(maxlen=history_size)
+        self.rejected = 0
+
+    def average_duration(self) -> float:
+        """Mean duration of recent transcriptions."""
+        if not self._durations:
+            return self.default_duration
+        return sum(self._durations) / len(self._durations)
+
+    def average_step_duration(self) -> float:
+        """Mean duration of recent live stream decoding steps."""
+        if not self._step_durations:
+            return self.default_step_duration
+        return sum(self._step_durations) / len(self._step_durations)
+
+    def estimated_wait(self) -> float:
+        """Seconds until a newly queued request would start, from recent throughput."""
+        if self._active < self.max_concurrent and not self._waiting and not self._waiting_steps:
+            return 0.0
+        queued = (self._waiting * self.average_duration()
+                  + self._waiting_steps * self.average_step_duration())
+        return (queued + self.average_duration()) / self.max_concurrent
+
+    def _check_rate(self, user_id: str, now: float) -> None:
+        """
+        Enforce the sliding-window request rate for a user. Only admitted
+        requests count, so retries after a 503 do not spend the budget.
+        """
+        requests = self._user_requests.setdefault(user_id, deque())
+        while requests and now - requests[0] >= self.rate_window_seconds:
+            requests.popleft()
+        if len(requests) >= self.rate_limit:
+            raise AdmissionRejected(
+                "Too many recordings, please slow down",
+                status_code=429,
+                retry_after=self.rate_window_seconds - (now - requests[0])
+            )
+
+    def _check_user(self, user_id: str) -> None:
+        """Enforce the user's in-flight quota and request rate."""
+        if self._user_inflight.get(user_id, 0) >= self.per_user_limit:
+            self.rejected += 1
+            raise AdmissionRejected(
+                "You already have recordings being processed",
+                status_code=429,
+                retry_after=self.average_duration()
+            )
+        try:
+            self._check_rate(user_id, time.monotonic())
+        except AdmissionRejected:
+            self.rejected += 1
+            raise
+
+    async def acquire(self, user_id: str) -> float:
+        """Wait for a transcription slot and return the admission time."""
+        self._check_user(user_id)
+
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                "Server is busy, please try again later",
+                status_code=503,
+                retry_after=self.estimated_wait()
+            )
+
+        self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+        if not self._slots.locked():
+            # A free slot is taken without yielding, so the counters stay exact
+            await self._slots.acquire()
+            return self._admit(user_id)
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._release_user(user_id)
+            self.rejected += 1
+            raise AdmissionRejected(
+                "Server is busy, please try again later",
+                status_code=503,
+                retry_after=self.estimated_wait()
+            )
+        except BaseException:
+            self._release_user(user_id)
+            raise
+        finally:
+            self._waiting -= 1
+        return self._admit(user_id)
+
+    def _admit(self, user_id: str) -> float:
+        """Count a request that got its slot and return the admission time."""
+        now = time.monotonic()
+        self._active += 1
+        self._user_requests.setdefault(user_id, deque()).append(now)
+        return now
+
+    def open_stream(self, user_id: str) -> None:
+        """Admit a live stream; it holds one of the user's in-flight slots until closed."""
+        if self._streams >= self.max_streams:
+            self.rejected += 1
+            raise AdmissionRejected(
+                "Too many live recordings, please try again later",
+                status_code=503,
+                retry_after=self.average_duration()
+            )
+        self._check_user(user_id)
+        self._streams += 1
+        self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+        self._user_requests.setdefault(user_id, deque()).append(time.monotonic())
+
+    def close_stream(self, user_id: str) -> None:
+        """Release a stream admitted by open_stream."""
+        self._streams -= 1
+        self._release_user(user_id)
+
+    async def acquire_step(self) -> float:
+        """
+        Wait for a slot for one decoding step of an open stream. Steps are
+        short and already admitted, so they queue without a size cap or timeout.
+        """
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            self._waiting_steps += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self._waiting_steps -= 1
+        self._active += 1
+        return time.monotonic()
+
+    def release_step(self, admitted_at: float) -> None:
+        """Free the slot taken by acquire_step."""
+        self._step_durations.append(time.monotonic() - admitted_at)
+        self._active -= 1
+        self._slots.release()
+
+    def release(self, user_id: str, admitted_at: float) -> None:
+        """Free the slot and record how long the transcription took."""
+        self._durations.append(time.monotonic() - admitted_at)
+        self._active -= 1
+        self._release_user(user_id)
+        self._slots.release()
+
+    def _release_user(self, user_id: str) -> None:
+        """Drop one in-flight request from the user's quota."""
+        remaining = self._user_inflight.get(user_id, 1) - 1
+        if remaining:
+            self._user_inflight[user_id] = remaining
+        else:
+            self._user_inflight.pop(user_id, None)
+
+    def snapshot(self) -> Dict:
+        """Current load for status reporting."""
+        return {
+            "active": self._active,
+            "queued": self._waiting,
+            "live_streams": self._streams,
+            "queued_stream_steps": self._waiting_steps,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "average_seconds": round(self.average_duration(), 2),
+            "estimated_wait_seconds": round(self.estimated_wait(), 2),
+            "rejected": self.rejected
+        }
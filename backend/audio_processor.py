@@ -1,24 +1,45 @@
 import os
-import whisper
+import threading
+import time
 from pydub import AudioSegment
-from typing import Dict, List
+from typing import Dict, List, Optional
 import uuid
+from inference_engine import InferenceEngine
 
 
 class AudioProcessor:
     """Handles audio processing and transcription."""
 
-    def __init__(self, model_size: str = "small"):
-        self.speech_model = whisper.load_model(model_size, device="cpu")
+    def __init__(self, model_size: str = "small", engine: Optional[InferenceEngine] = None):
+        self.engine = engine or InferenceEngine(model_size)
+        self.speech_model = self.engine.load_model()
+        # Whisper installs kv-cache hooks on the model per call, so calls must not overlap
+        self._model_lock = threading.Lock()
+        self.decoding_stats = {
+            "transcriptions": 0,
+            "windows": 0,
+            "fallback_windows": 0,
+            "transcriptions_with_fallback": 0,
+            "language_detections": 0,
+            "decode_seconds": 0.0
+        }
 
-    def process_audio(self, audio_content: bytes, filename: str) -> Dict:
+    def process_audio(self, audio_content: bytes, filename: str,
+                      decode_options: Optional[Dict] = None) -> Dict:
         """Transcribe audio content and return results."""
         temp_files = self._create_temp_files(audio_content, filename)
         try:
-            transcription = self._perform_transcription(temp_files.process_path)
+            decode_options = decode_options or {}
+            decode_start = time.perf_counter()
+            transcription = self._perform_transcription(temp_files.process_path, decode_options)
+            fallback_windows = self._record_decoding_stats(
+                transcription, decode_options, time.perf_counter() - decode_start
+            )
             return {
                 "text": transcription["text"],
                 "segments": self._extract_word_chunks(transcription),
+                "language": transcription.get("language"),
+                "fallback_windows": fallback_windows,
                 "wav_path": temp_files.process_path,  # Return the .wav path for storage
                 "temp_input_path": temp_files.input_path  # Return input path for cleanup
             }
@@ -47,9 +68,48 @@ class AudioProcessor:
 
         return TempFiles(input_path, process_path)
 
-    def _perform_transcription(self, audio_path: str) -> Dict:
+    def _perform_transcription(self, audio_path: str, decode_options: Dict) -> Dict:
         """Execute Whisper transcription."""
-        return self.speech_model.transcribe(audio_path, word_timestamps=True, fp16=False)
+        with self._model_lock:
+            return self.speech_model.transcribe(
+                audio_path, word_timestamps=True, fp16=False, **decode_options
+            )
+
+    def transcribe_samples(self, samples, decode_options: Dict) -> Dict:
+        """Transcribe in-memory 16 kHz float32 samples, e.g. a window of a live stream."""
+        with self._model_lock:
+            transcription = self.speech_model.transcribe(
+                samples, word_timestamps=True, fp16=False,
+                condition_on_previous_text=False, **decode_options
+            )
+        return {
+            "text": transcription["text"],
+            "segments": self._extract_word_chunks(transcription),
+            "language": transcription.get("language")
+        }
+
+    def _record_decoding_stats(self, transcription: Dict, decode_options: Dict,
+                               elapsed: float) -> int:
+        """Count decode windows that fell back to a higher temperature."""
+        temperatures = decode_options.get("temperature", (0.0,))
+        if isinstance(temperatures, (int, float)):
+            temperatures = (temperatures,)
+        base_temperature = temperatures[0] if temperatures else 0.0
+
+        # Segments decoded from the same 30 s window share its seek and temperature
+        window_temperatures = {}
+        for segment in transcription["segments"]:
+            window_temperatures[segment.get("seek", segment["id"])] = segment.get("temperature", 0.0)
+        fallback_windows = sum(1 for t in window_temperatures.values() if t > base_temperature)
+
+        stats = self.decoding_stats
+        stats["transcriptions"] += 1
+        stats["windows"] += len(window_temperatures)
+        stats["fallback_windows"] += fallback_windows
+        stats["transcriptions_with_fallback"] += 1 if fallback_windows else 0
+        stats["language_detections"] += 0 if decode_options.get("language") else 1
+        stats["decode_seconds"] += elapsed
+        return fallback_windows
 
     @staticmethod
     def _extract_word_chunks(transcription: Dict) -> List[Dict]:
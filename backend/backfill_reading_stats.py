@@ -0,0 +1,15 @@
+"""
+Compute reading metrics for existing recordings and rebuild the per-user and
+per-document aggregates.
+
+Usage: python backfill_reading_stats.py <credential_path> <database_url>
+"""
+import sys
+from database_manager import DatabaseManager
+from reading_analytics import ReadingAnalytics
+
+
+if __name__ == "__main__":
+    storage = DatabaseManager(credential_path=sys.argv[1], database_url=sys.argv[2])
+    processed = ReadingAnalytics(storage).backfill()
+    print(f"Processed {processed} recordings")
@@ -0,0 +1,121 @@
+import hashlib
+import os
+from typing import Dict, Optional
+from database_manager import DatabaseManager
+
+
+class ContentIndex:
+    """
+    Maps content hashes of uploads to stored artifacts so identical uploads
+    reuse parsed text, PDF blobs, audio files and transcripts. PDFs and audio
+    files are stored once; text and transcripts are still copied into each
+    record. Each artifact carries a reference count and is only removed when
+    the last user is deleted.
+    """
+
+    def __init__(self, storage: DatabaseManager):
+        self.storage = storage
+
+    @staticmethod
+    def hash_content(kind: str, data: bytes) -> str:
+        """Hash uploaded bytes; the kind keeps text, PDF and audio hashes apart."""
+        return f"{kind}-{hashlib.sha256(data).hexdigest()}"
+
+    @staticmethod
+    def _increment(ref, delta: int) -> int:
+        """Atomically change a reference count and return the new value."""
+        return ref.transaction(lambda count: max(0, (count or 0) + delta))
+
+    def find_document(self, content_hash: str) -> Optional[Dict]:
+        """Return the parsed text and language of an earlier identical upload."""
+        source_id = self.storage.document_blob_ref.child(content_hash).child("source_document_id").get()
+        if not source_id:
+            return None
+        try:
+            return self.storage.fetch_document_fields(source_id, ["text_content", "language"])
+        except ValueError:
+            return None
+
+    def register_document(self, content_hash: str, doc_id: str, pdf_content: Optional[str]) -> bool:
+        """
+        Add a reference to the document blob, creating it on first use.
+        Returns False if the blob is new but no PDF was supplied for it.
+        """
+        blob_ref = self.storage.document_blob_ref.child(content_hash)
+        if self._increment(blob_ref.child("ref_count"), 1) > 1:
+            # Keep the text source pointing at a live document
+            blob_ref.update({"source_document_id": doc_id})
+            return True
+        if pdf_content is None:
+            return False
+        blob_ref.update({"pdf_content": pdf_content, "source_document_id": doc_id})
+        return True
+
+    def store_document_pdf(self, content_hash: str, doc_id: str, pdf_content: str) -> None:
+        """Attach the PDF to a blob created without one and make the document its text source."""
+        self.storage.document_blob_ref.child(content_hash).update({
+            "pdf_content": pdf_content,
+            "source_document_id": doc_id
+        })
+
+    @staticmethod
+    def _release(blob_ref) -> Optional[Dict]:
+        """
+        Drop a reference and delete the blob in the same transaction once it is
+        unused, so a concurrent upload cannot take a reference in between.
+        Returns the deleted blob, or None while it is still referenced.
+        """
+        outcome = {}
+
+        def drop(blob: Optional[Dict]) -> Optional[Dict]:
+            blob = blob or {}
+            count = max(0, (blob.get("ref_count") or 0) - 1)
+            outcome["deleted"] = None if count else blob
+            return {**blob, "ref_count": count} if count else None
+
+        blob_ref.transaction(drop)
+        return outcome["deleted"]
+
+    def release_document(self, content_hash: str) -> None:
+        """Drop a reference to the document blob, deleting it when unused."""
+        self._release(self.storage.document_blob_ref.child(content_hash))
+
+    def find_audio(self, content_hash: str) -> Optional[Dict]:
+        """Return the stored file and transcript of an earlier identical recording."""
+        blob = self.storage.audio_blob_ref.child(content_hash).get()
+        if not blob or not blob.get("audio_path") or not os.path.exists(blob["audio_path"]):
+            return None
+        return {
+            "audio_path": blob["audio_path"],
+            "text": blob.get("transcribed_text", ""),
+            "segments": blob.get("word_timings") or [],
+            "language": blob.get("language")
+        }
+
+    def register_audio(self, content_hash: str, recording_data: Dict,
+                       language: Optional[str]) -> None:
+        """Add a reference to the audio artifact, creating it on first use."""
+        blob_ref = self.storage.audio_blob_ref.child(content_hash)
+        is_new = self._increment(blob_ref.child("ref_count"), 1) == 1
+        shared_path = None if is_new else blob_ref.child("audio_path").get()
+        # A new artifact, or one whose file went missing, takes this recording's file
+        if is_new or not shared_path or not os.path.exists(shared_path):
+            blob_ref.update({
+                "audio_path": recording_data["audio_path"],
+                "transcribed_text": recording_data["transcribed_text"],
+                "word_timings": recording_data["word_timings"],
+                "language": language
+            })
+
+    def release_audio(self, content_hash: Optional[str], audio_path: Optional[str]) -> None:
+        """Drop a reference to a recording's audio, deleting the file when unused."""
+        paths = {audio_path}
+        if content_hash:
+            deleted = self._release(self.storage.audio_blob_ref.child(content_hash))
+            if deleted is None:
+                return
+            # The blob may have been repointed to a newer recording's file
+            paths.add(deleted.get("audio_path"))
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
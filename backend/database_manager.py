@@ -1,14 +1,29 @@
 import firebase_admin
 from firebase_admin import credentials, db
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Tuple
+import time
 import shortuuid  # Updated import
 
+# Server-side increment, so a counter changes in the same write as the revision
+INCREMENT = {".sv": {"increment": 1}}
+
+# Top-level fields a document record can hold, and those too large to fetch unasked
+DOCUMENT_FIELDS = ("content_hash", "language", "pdf_content", "recording_count",
+                   "revision", "text_content", "user_id")
+LARGE_FIELDS = {"audio_recordings", "pdf_content", "text_content"}
+
 class DatabaseManager:
     """Handles all Firebase database operations."""
 
     def __init__(self, credential_path: str, database_url: str):
         self._setup_firebase(credential_path, database_url)
         self.document_ref = db.reference("document_files")
+        self.recording_ref = db.reference("recordings")
+        self.recording_index_ref = db.reference("recording_index")
+        self.document_blob_ref = db.reference("document_blobs")
+        self.audio_blob_ref = db.reference("audio_blobs")
+        self.user_document_ref = db.reference("user_documents")
+        self.reading_stats_ref = db.reference("reading_stats")
 
     @staticmethod
     def _setup_firebase(cred_path: str, db_url: str) -> None:
@@ -17,25 +32,208 @@ class DatabaseManager:
             firebase_cred = credentials.Certificate(cred_path)
             firebase_admin.initialize_app(firebase_cred, {"databaseURL": db_url})
 
+    @staticmethod
+    def _new_revision() -> Dict:
+        """Create a revision marker; every write to a document replaces it."""
+        return {"etag": shortuuid.uuid(), "updated_at": time.time()}
+
     def store_document(self, document_data: Dict, doc_id: str) -> None:
         """Save document data to Firebase."""
         try:
-            self.document_ref.child(doc_id).set(document_data)
+            # The document and its owner's index entry are written together
+            db.reference().update({
+                f"document_files/{doc_id}": {**document_data, "revision": self._new_revision()},
+                f"user_documents/{document_data['user_id']}/{doc_id}": True
+            })
         except Exception as error:
             raise RuntimeError("Document storage failed") from error
 
+    def update_document(self, doc_id: str, updates: Dict) -> None:
+        """Update selected fields of a stored document."""
+        try:
+            self.document_ref.child(doc_id).update({**updates, "revision": self._new_revision()})
+        except Exception as error:
+            raise RuntimeError("Document update failed") from error
+
     def add_audio_recording(self, doc_id: str, audio_info: Dict) -> str:
         """Store audio recording metadata with file path and return generated ID."""
         try:
             recording_id = shortuuid.uuid()
-            self.document_ref.child(doc_id).child("audio_recordings").child(recording_id).set(audio_info)
+            db.reference().update({
+                **self._recording_updates(doc_id, recording_id, audio_info),
+                f"document_files/{doc_id}/recording_count": INCREMENT,
+                f"document_files/{doc_id}/revision": self._new_revision()
+            })
             return recording_id
         except Exception as error:
             raise RuntimeError("Audio storage failed") from error
 
+    @staticmethod
+    def recording_summary(audio_info: Dict) -> Dict:
+        """Small per-document index entry for a recording."""
+        return {
+            "uploader_id": audio_info.get("uploader_id"),
+            "content_match": audio_info.get("content_match"),
+            "created_at": audio_info.get("created_at", 0)
+        }
+
+    def _recording_updates(self, doc_id: str, recording_id: str, audio_info: Dict) -> Dict:
+        """Multi-path entries for a recording and its index entry."""
+        return {
+            f"recordings/{recording_id}": {**audio_info, "document_id": doc_id},
+            f"recording_index/{doc_id}/{recording_id}": self.recording_summary(audio_info)
+        }
+
+    def fetch_recording(self, doc_id: str, recording_id: str) -> Dict:
+        """Retrieve a single recording without loading its document."""
+        recording = self.recording_ref.child(recording_id).get()
+        if not recording or recording.get("document_id") != doc_id:
+            raise ValueError("Recording not found")
+        return recording
+
+    def list_recording_summaries(self, doc_id: str, limit: int,
+                                 cursor: Optional[str] = None) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """
+        Return one page of recording summaries ordered by ID and the cursor
+        for the next page (None on the last page).
+        """
+        query = self.recording_index_ref.child(doc_id).order_by_key()
+        if cursor:
+            query = query.start_at(cursor)
+        page = query.limit_to_first(limit + 1).get() or {}
+
+        recording_ids = sorted(page)
+        next_cursor = recording_ids[limit] if len(recording_ids) > limit else None
+        return {rec_id: page[rec_id] for rec_id in recording_ids[:limit]}, next_cursor
+
+    def all_recording_summaries(self, doc_id: str) -> Dict[str, Dict]:
+        """Retrieve every recording summary of a document."""
+        return self.recording_index_ref.child(doc_id).get() or {}
+
+    def migrate_nested_recordings(self) -> int:
+        """
+        Move recordings stored under document_files/<id>/audio_recordings into
+        per-recording records. Safe to run repeatedly; returns the number moved.
+        """
+        moved = 0
+        doc_ids = self.document_ref.get(shallow=True) or {}
+        for doc_id in doc_ids:
+            nested = self.document_ref.child(doc_id).child("audio_recordings").get() or {}
+            if not nested:
+                continue
+            # Records, count, removal of the nested copy and the revision change together
+            updates = {f"document_files/{doc_id}/audio_recordings": None}
+            for recording_id, audio_info in nested.items():
+                updates.update(self._recording_updates(doc_id, recording_id, audio_info))
+            recording_ids = set(self.recording_index_ref.child(doc_id).get(shallow=True) or {}) | set(nested)
+            updates[f"document_files/{doc_id}/recording_count"] = len(recording_ids)
+            updates[f"document_files/{doc_id}/revision"] = self._new_revision()
+            db.reference().update(updates)
+            moved += len(nested)
+        return moved
+
+    def stamp_revisions(self) -> int:
+        """Give documents stored before versioning a revision; returns the number stamped."""
+        stamped = 0
+        for doc_id in self.document_ref.get(shallow=True) or {}:
+            revision_ref = self.document_ref.child(doc_id).child("revision")
+            if revision_ref.get(shallow=True) is not None:
+                continue
+            revision = self._new_revision()
+            # A concurrent write may have set one meanwhile; keep it
+            if revision_ref.transaction(lambda current: current or revision) == revision:
+                stamped += 1
+        return stamped
+
+    def list_user_document_ids(self, user_id: str) -> List[str]:
+        """Retrieve the IDs of all documents uploaded by a user."""
+        return sorted(self.user_document_ref.child(user_id).get(shallow=True) or {})
+
+    def backfill_user_documents(self) -> int:
+        """Index documents stored before per-user indexing; returns the number indexed."""
+        indexed = 0
+        for doc_id in self.document_ref.get(shallow=True) or {}:
+            user_id = self.document_ref.child(doc_id).child("user_id").get()
+            if user_id:
+                self.user_document_ref.child(user_id).child(doc_id).set(True)
+                indexed += 1
+        return indexed
+
+    def fetch_revision(self, doc_id: str) -> Optional[Dict]:
+        """Retrieve only the document's revision marker, or None for unversioned records."""
+        return self.document_ref.child(doc_id).child("revision").get()
+
+    def fetch_document_fields(self, doc_id: str, fields: Iterable[str]) -> Dict:
+        """
+        Retrieve selected top-level fields without downloading the whole document.
+        Fields are read with key-range queries, one per run of stored keys that
+        does not cross an unrequested large field, so most projections take one call.
+        """
+        requested = set(fields)
+        wanted = set(requested)
+        if "pdf_content" in requested:
+            # Older records keep the PDF inline; newer ones point to a blob by hash
+            wanted.add("content_hash")
+
+        stored = {}
+        for first, last in self._key_ranges(wanted):
+            page = self.document_ref.child(doc_id).order_by_key().start_at(first).end_at(last).get()
+            stored.update(page or {})
+        if not stored and not self.document_exists(doc_id):
+            raise ValueError("Document not found")
+
+        if "pdf_content" in requested and stored.get("pdf_content") is None and stored.get("content_hash"):
+            stored["pdf_content"] = self.document_blob_ref.child(stored["content_hash"]).child("pdf_content").get()
+        # Missing fields are omitted, matching what a full fetch returns
+        return {field: stored[field] for field in requested if stored.get(field) is not None}
+
+    @staticmethod
+    def _key_ranges(fields: Iterable[str]) -> List[Tuple[str, str]]:
+        """Group wanted fields into key ranges that skip unwanted large fields."""
+        wanted = set(fields) & set(DOCUMENT_FIELDS)
+        ranges, run = [], []
+        for field in sorted(set(DOCUMENT_FIELDS) | LARGE_FIELDS):
+            if field in wanted:
+                run.append(field)
+            elif field in LARGE_FIELDS and run:
+                ranges.append((run[0], run[-1]))
+                run = []
+        if run:
+            ranges.append((run[0], run[-1]))
+        return ranges
+
+    def document_exists(self, doc_id: str) -> bool:
+        """Check that a document is stored; every document records its uploader."""
+        return self.document_ref.child(doc_id).child("user_id").get() is not None
+
     def fetch_document(self, doc_id: str) -> Dict:
         """Retrieve document data from Firebase."""
         doc_data = self.document_ref.child(doc_id).get()
         if not doc_data:
             raise ValueError("Document not found")
-        return doc_data
\ No newline at end of file
+        if "pdf_content" not in doc_data and doc_data.get("content_hash"):
+            doc_data["pdf_content"] = self.document_blob_ref.child(doc_data["content_hash"]).child("pdf_content").get()
+        return doc_data
+
+    def delete_document(self, doc_id: str) -> Dict[str, Dict]:
+        """
+        Delete a document with its recordings and return the deleted recordings
+        so shared audio can be released by the caller.
+        """
+        try:
+            deleted = {}
+            updates = {f"document_files/{doc_id}": None, f"recording_index/{doc_id}": None}
+            user_id = self.document_ref.child(doc_id).child("user_id").get()
+            if user_id:
+                updates[f"user_documents/{user_id}/{doc_id}"] = None
+            for recording_id in self.all_recording_summaries(doc_id):
+                recording_ref = self.recording_ref.child(recording_id)
+                deleted[recording_id] = {
+                    field: recording_ref.child(field).get()
+                    for field in ("audio_hash", "audio_path", "uploader_id", "metrics", "created_at")
+                }
+                updates[f"recordings/{recording_id}"] = None
+            db.reference().update(updates)
+            return deleted
+        except Exception as error:
+            raise RuntimeError("Document deletion failed") from error
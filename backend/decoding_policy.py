@@ -0,0 +1,96 @@
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+class DecodingPolicy:
+    """Builds Whisper decoding options from the document being read."""
+
+    def __init__(
+        self,
+        temperatures: Tuple[float, ...] = (0.0, 0.4, 0.8),
+        beam_size: Optional[int] = None,
+        best_of: Optional[int] = None,
+        prompt_tokens: int = 200,
+        resume_match_words: int = 6
+    ):
+        self.temperatures = tuple(temperatures)
+        self.beam_size = beam_size
+        self.best_of = best_of
+        # Whisper keeps only the last 223 prompt tokens and would cut the passage start
+        self.prompt_tokens = prompt_tokens
+        self.resume_match_words = resume_match_words
+
+    def build_options(self, document_text: str, language: Optional[str] = None,
+                      previous_transcript: Optional[str] = None) -> Dict:
+        """
+        Return keyword arguments for transcribe().
+        A known language skips detection, and the located passage primes the
+        decoder with the document's vocabulary so fewer windows need fallback.
+        """
+        options = {"temperature": self.temperatures}
+        if language:
+            options["language"] = language
+        if self.beam_size:
+            options["beam_size"] = self.beam_size
+        if self.best_of:
+            options["best_of"] = self.best_of
+
+        passage = self.locate_passage(document_text, previous_transcript)
+        if passage:
+            options["initial_prompt"] = passage
+        return options
+
+    def locate_passage(self, document_text: str, previous_transcript: Optional[str] = None) -> str:
+        """
+        Pick the part of the document the reader is most likely reading.
+        Continues after the end of the uploader's previous recording when it
+        can be found in the document, otherwise starts at the beginning.
+        """
+        words = document_text.split()
+        if not words:
+            return ""
+
+        start = 0
+        if previous_transcript:
+            start = self._find_resume_index(words, previous_transcript)
+
+        passage = []
+        budget = self.prompt_tokens
+        for word in words[start:]:
+            budget -= self._count_tokens(" " + word)
+            if budget < 0:
+                break
+            passage.append(word)
+        return " ".join(passage)
+
+    @staticmethod
+    def _count_tokens(text: str) -> int:
+        """
+        Count Whisper tokens in a text. The tokenizer is used once the speech
+        model has imported whisper; until then the count is a conservative
+        estimate from the UTF-8 length, so the prompt stays within the limit.
+        """
+        whisper_tokenizer = sys.modules.get("whisper.tokenizer")
+        if whisper_tokenizer is not None:
+            return len(whisper_tokenizer.get_tokenizer(multilingual=True).encode(text))
+        return len(text.encode("utf-8")) // 4 + 1
+
+    def _find_resume_index(self, words: List[str], previous_transcript: str) -> int:
+        """Return the word index just after the last occurrence of the transcript's tail."""
+        tail = self._normalize(previous_transcript)[-self.resume_match_words:]
+        if not tail:
+            return 0
+
+        normalized = [self._normalize(word) for word in words]
+        flat = [token[0] if token else "" for token in normalized]
+        for index in range(len(flat) - len(tail), -1, -1):
+            if flat[index:index + len(tail)] == tail:
+                resume = index + len(tail)
+                return resume if resume < len(words) else 0
+        return 0
+
+    @staticmethod
+    def _normalize(text: str) -> List[str]:
+        """Lowercase and strip punctuation for word matching."""
+        return re.sub(r'[^\w\s]', '', text.lower()).split()
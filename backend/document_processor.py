@@ -1,8 +1,20 @@
 from io import BytesIO
 import base64
+import re
+from typing import Optional
 import PyPDF2
 from reportlab.pdfgen import canvas
 
+# Frequent function words used to guess a document's language (Whisper codes)
+LANGUAGE_STOPWORDS = {
+    "en": {"the", "and", "of", "to", "is", "in", "that", "it", "was", "for"},
+    "ru": {"и", "в", "не", "на", "что", "с", "он", "как", "это", "по"},
+    "de": {"der", "die", "und", "das", "ist", "nicht", "zu", "ein", "ich", "mit"},
+    "fr": {"le", "la", "et", "les", "des", "est", "un", "une", "que", "pas"},
+    "es": {"el", "la", "que", "y", "los", "del", "las", "por", "una", "con"},
+    "it": {"il", "di", "che", "e", "la", "non", "per", "un", "sono", "della"},
+}
+
 
 class DocumentProcessor:
     """Handles document processing operations."""
@@ -39,4 +51,21 @@ class DocumentProcessor:
     @staticmethod
     def convert_to_base64(data: bytes) -> str:
         """Convert binary data to base64 string."""
-        return base64.b64encode(data).decode("utf-8")
\ No newline at end of file
+        return base64.b64encode(data).decode("utf-8")
+
+    @staticmethod
+    def detect_language(text_content: str, sample_words: int = 2000) -> Optional[str]:
+        """Guess the text language from function-word frequency, or None if unsure."""
+        words = re.sub(r'[^\w\s]', '', text_content.lower()).split()[:sample_words]
+        if not words:
+            return None
+
+        scores = {
+            language: sum(1 for word in words if word in stopwords)
+            for language, stopwords in LANGUAGE_STOPWORDS.items()
+        }
+        best_language = max(scores, key=scores.get)
+        # Require a clear share of function words before trusting the guess
+        if scores[best_language] < max(3, len(words) // 20):
+            return None
+        return best_language
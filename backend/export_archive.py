@@ -0,0 +1,112 @@
+import base64
+import csv
+import io
+import json
+import os
+import zipfile
+from typing import Iterable, Iterator
+from database_manager import DatabaseManager
+
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_archive(storage: DatabaseManager, document_ids: Iterable[str],
+                   nested: bool = False) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of documents, their audio and transcripts chunk by chunk.
+    Recordings are read one at a time, so memory stays bounded by the largest
+    single entry rather than the whole archive. With `nested`, each document
+    goes into its own folder (used for per-user exports).
+    """
+    sink = _ChunkSink()
+    # The sink cannot seek, so zipfile writes data descriptors after each entry
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for doc_id in document_ids:
+            prefix = f"{doc_id}/" if nested else ""
+            for chunk in _write_document(storage, archive, sink, doc_id, prefix):
+                if chunk:
+                    yield chunk
+    yield sink.drain()
+
+
+def _write_document(storage: DatabaseManager, archive: zipfile.ZipFile, sink: _ChunkSink,
+                    doc_id: str, prefix: str) -> Iterator[bytes]:
+    """Add one document's PDF, text, audio files and transcripts to the archive."""
+    try:
+        doc_data = storage.fetch_document_fields(doc_id, ["pdf_content", "text_content"])
+    except ValueError:
+        return  # Deleted after the export was started
+    if doc_data.get("pdf_content"):
+        # PDFs are already compressed
+        archive.writestr(f"{prefix}document.pdf", base64.b64decode(doc_data["pdf_content"]),
+                         compress_type=zipfile.ZIP_STORED)
+        yield sink.drain()
+    archive.writestr(f"{prefix}document.txt", doc_data.get("text_content", ""))
+    yield sink.drain()
+
+    summary_buffer = io.StringIO()
+    summary_writer = csv.writer(summary_buffer)
+    summary_writer.writerow(["recording_id", "uploader_id", "created_at", "content_match", "transcribed_text"])
+
+    for recording_id in storage.all_recording_summaries(doc_id):
+        try:
+            recording = storage.fetch_recording(doc_id, recording_id)
+        except ValueError:
+            continue  # Deleted while the archive was being written
+        word_timings = recording.get("word_timings") or []
+
+        audio_path = recording.get("audio_path")
+        if audio_path and os.path.exists(audio_path):
+            with open(audio_path, "rb") as audio_file, \
+                    archive.open(f"{prefix}audio/{recording_id}.wav", mode="w") as entry:
+                while True:
+                    chunk = audio_file.read(FILE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+
+        transcript = {
+            "recording_id": recording_id,
+            "uploader_id": recording.get("uploader_id"),
+            "created_at": recording.get("created_at"),
+            "content_match": recording.get("content_match"),
+            "transcribed_text": recording.get("transcribed_text", ""),
+            "word_timings": word_timings
+        }
+        archive.writestr(f"{prefix}transcripts/{recording_id}.json",
+                         json.dumps(transcript, ensure_ascii=False, indent=2))
+
+        timings_buffer = io.StringIO()
+        timings_writer = csv.writer(timings_buffer)
+        timings_writer.writerow(["word_index", "text", "start", "end"])
+        for word_index, word in enumerate(word_timings):
+            timings_writer.writerow([word_index, word.get("text", "").strip(), word.get("start"), word.get("end")])
+        archive.writestr(f"{prefix}transcripts/{recording_id}.csv", timings_buffer.getvalue())
+        yield sink.drain()
+
+        summary_writer.writerow([recording_id, transcript["uploader_id"], transcript["created_at"],
+                                 transcript["content_match"], transcript["transcribed_text"]])
+
+    archive.writestr(f"{prefix}recordings.csv", summary_buffer.getvalue())
+    yield sink.drain()
@@ -0,0 +1,209 @@
+import os
+import re
+import sys
+import time
+import logging
+import multiprocessing
+import torch
+import whisper
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from decoding_policy import DecodingPolicy
+
+logger = logging.getLogger(__name__)
+
+COMPILE_MODES = (None, "compile", "torchscript")
+
+
+class InferenceEngine:
+    """Loads a Whisper model configured for CPU inference."""
+
+    def __init__(
+        self,
+        model_size: str = "small",
+        quantize: bool = False,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        compile_mode: Optional[str] = None
+    ):
+        if compile_mode not in COMPILE_MODES:
+            raise ValueError(f"Unsupported compile mode: {compile_mode}")
+        self.model_size = model_size
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.compile_mode = compile_mode
+
+    def describe(self) -> Dict:
+        """Return the engine settings as a plain dictionary."""
+        return {
+            "model_size": self.model_size,
+            "quantize": self.quantize,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "compile_mode": self.compile_mode
+        }
+
+    def load_model(self):
+        """Apply thread budgets and load the model with the configured optimizations."""
+        self._apply_thread_budget()
+        model = whisper.load_model(self.model_size, device="cpu")
+        model.eval()
+
+        if self.quantize:
+            model = self._quantize_linear_layers(model)
+        if self.compile_mode == "compile":
+            model = self._compile(model)
+        elif self.compile_mode == "torchscript":
+            model = self._trace_encoder(model)
+        return model
+
+    def _apply_thread_budget(self) -> None:
+        """Limit torch thread pools so several workers do not oversubscribe cores."""
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError:
+                # Inter-op threads can only be set once, before any parallel work
+                logger.warning("Inter-op thread count already fixed, keeping %s",
+                               torch.get_num_interop_threads())
+
+    @staticmethod
+    def _quantize_linear_layers(model):
+        """Convert linear layers to dynamically quantized int8 layers."""
+        # Whisper subclasses nn.Linear to cast weights per call; the quantizer
+        # only accepts plain nn.Linear, which is equivalent in float32 on CPU.
+        for parent in list(model.modules()):
+            for name, child in list(parent.named_children()):
+                if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                    plain = torch.nn.Linear(child.in_features, child.out_features,
+                                            bias=child.bias is not None)
+                    plain.weight = child.weight
+                    plain.bias = child.bias
+                    setattr(parent, name, plain)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    @staticmethod
+    def _compile(model):
+        """Compile the encoder and decoder with torch.compile, keeping eager mode on failure."""
+        try:
+            model.encoder = torch.compile(model.encoder)
+            model.decoder = torch.compile(model.decoder, dynamic=True)
+        except Exception as error:
+            logger.warning("torch.compile unavailable, using eager model: %s", error)
+        return model
+
+    @staticmethod
+    def _trace_encoder(model):
+        """Replace the encoder with a TorchScript trace over the fixed 30 s mel window."""
+        # The decoder keeps a dynamic kv-cache and cannot be traced, but the
+        # encoder always sees a padded (1, n_mels, 3000) spectrogram.
+        try:
+            sample = torch.zeros(1, model.dims.n_mels, whisper.audio.N_FRAMES)
+            with torch.no_grad():
+                model.encoder = torch.jit.trace(model.encoder, sample)
+        except Exception as error:
+            logger.warning("TorchScript tracing failed, using eager encoder: %s", error)
+        return model
+
+
+def _word_error_rate(reference: str, hypothesis: str) -> float:
+    """Compute word error rate between two transcripts."""
+    def normalize(text: str) -> List[str]:
+        return re.sub(r'[^\w\s]', '', text.lower()).split()
+
+    ref_words = normalize(reference)
+    hyp_words = normalize(hypothesis)
+    if not ref_words:
+        return 0.0 if not hyp_words else 1.0
+
+    previous = list(range(len(hyp_words) + 1))
+    for i, ref_word in enumerate(ref_words, start=1):
+        current = [i] + [0] * len(hyp_words)
+        for j, hyp_word in enumerate(hyp_words, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / len(ref_words)
+
+
+def _run_engine(settings: Dict, audio_paths: List[str], decode_options: Dict) -> Dict:
+    """Load one engine and transcribe the audio set; runs in its own process."""
+    load_start = time.perf_counter()
+    model = InferenceEngine(**settings).load_model()
+    load_seconds = time.perf_counter() - load_start
+
+    transcripts = {}
+    decode_start = time.perf_counter()
+    for path in audio_paths:
+        with torch.inference_mode():
+            # Same arguments as AudioProcessor, so timings match production
+            transcripts[path] = model.transcribe(
+                path, word_timestamps=True, fp16=False, **decode_options
+            )["text"]
+    return {
+        "load_seconds": load_seconds,
+        "decode_seconds": time.perf_counter() - decode_start,
+        "transcripts": transcripts
+    }
+
+
+def compare_engines(audio_paths: List[str], engines: List[InferenceEngine],
+                    references: Optional[Dict[str, str]] = None,
+                    decode_options: Optional[Dict] = None) -> List[Dict]:
+    """
+    Transcribe a fixed audio set with each engine and report speed and accuracy.
+    Each engine runs in a fresh process, since thread budgets can only be set
+    once per process and a loaded model would skew the next measurement.
+    Without reference transcripts, the first engine's output is the baseline.
+    """
+    if decode_options is None:
+        decode_options = DecodingPolicy().build_options("")
+    results = []
+    for engine in engines:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            run = executor.submit(_run_engine, engine.describe(), audio_paths, decode_options).result()
+
+        transcripts = run["transcripts"]
+        if references is None:
+            references = transcripts
+        error_rates = [_word_error_rate(references.get(path, ""), text)
+                       for path, text in transcripts.items()]
+
+        results.append({
+            **engine.describe(),
+            "load_seconds": round(run["load_seconds"], 2),
+            "decode_seconds": round(run["decode_seconds"], 2),
+            "seconds_per_file": round(run["decode_seconds"] / max(1, len(audio_paths)), 2),
+            "word_error_rate": round(sum(error_rates) / max(1, len(error_rates)), 4)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python inference_engine.py <audio_dir> [model_size] [language]
+    audio_dir = sys.argv[1]
+    size = sys.argv[2] if len(sys.argv) > 2 else "small"
+    language = sys.argv[3] if len(sys.argv) > 3 else None
+    paths = sorted(os.path.join(audio_dir, name) for name in os.listdir(audio_dir))
+    threads = max(1, (os.cpu_count() or 1) // 2)
+
+    # Decode with the schedule configured for the server
+    policy = DecodingPolicy(
+        temperatures=tuple(float(t) for t in os.getenv("WHISPER_TEMPERATURES", "0.0,0.4,0.8").split(",")),
+        beam_size=int(os.getenv("WHISPER_BEAM_SIZE", "0")) or None,
+        best_of=int(os.getenv("WHISPER_BEST_OF", "0")) or None
+    )
+    candidates = [
+        InferenceEngine(size),
+        InferenceEngine(size, intra_op_threads=threads, inter_op_threads=1),
+        InferenceEngine(size, quantize=True, intra_op_threads=threads, inter_op_threads=1),
+        InferenceEngine(size, quantize=True, intra_op_threads=threads, compile_mode="torchscript"),
+    ]
+    for row in compare_engines(paths, candidates, decode_options=policy.build_options("", language)):
+        print(row)
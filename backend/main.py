@@ -1,44 +1,130 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, UploadFile, File, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import Optional
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
 import shortuuid
 import os
 import shutil
-from database_manager import DatabaseManager
+import threading
+import time
 from document_processor import DocumentProcessor
-from audio_processor import AudioProcessor
+from decoding_policy import DecodingPolicy
+from admission_control import AdmissionController, AdmissionRejected
+from search_index import SearchIndex
+from stream_transcriber import StreamingTranscriber
+from export_archive import stream_archive
+from reading_analytics import recording_metrics
+from response_utils import etag_matches, json_response, not_modified, revision_headers
+from service_registry import ServiceRegistry
+from database_manager import DOCUMENT_FIELDS
 from similarity_checker import SimilarityChecker
 
 # Ensure audio recordings directory exists
 AUDIO_STORAGE_PATH = "static/audiorecordings"
 os.makedirs(AUDIO_STORAGE_PATH, exist_ok=True)
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "data/search_index.pkl")
 
-# Initialize service components
-document_storage = DatabaseManager(
+# Service components; storage and the speech model are created on first use
+services = ServiceRegistry(
     credential_path="",
-    database_url=""
+    database_url="",
+    engine_settings={
+        "model_size": os.getenv("WHISPER_MODEL_SIZE", "small"),
+        "quantize": os.getenv("WHISPER_QUANTIZE", "0") == "1",
+        "intra_op_threads": int(os.getenv("WHISPER_INTRA_OP_THREADS", "0")) or None,
+        "inter_op_threads": int(os.getenv("WHISPER_INTER_OP_THREADS", "0")) or None,
+        "compile_mode": os.getenv("WHISPER_COMPILE_MODE") or None
+    }
 )
 
 doc_handler = DocumentProcessor()
-audio_handler = AudioProcessor()
 content_checker = SimilarityChecker()
-
-# Initialize FastAPI app
-app = FastAPI(title="Document Processing API", version="1.0")
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["Content-Length", "Content-Range", "Content-Type", "Accept-Ranges"]
+# One transcription per worker: there is a single model, and concurrent
+# transcribe() calls on it would interleave its decoding hooks. All limits
+# are kept in this process, so with N workers each is effectively N times higher.
+admission = AdmissionController(
+    max_concurrent=1,
+    max_queue=int(os.getenv("TRANSCRIPTION_MAX_QUEUE", "8")),
+    max_wait_seconds=float(os.getenv("TRANSCRIPTION_MAX_WAIT_SECONDS", "120")),
+    per_user_limit=int(os.getenv("TRANSCRIPTION_PER_USER_LIMIT", "2")),
+    rate_limit=int(os.getenv("TRANSCRIPTION_RATE_LIMIT", "10")),
+    rate_window_seconds=float(os.getenv("TRANSCRIPTION_RATE_WINDOW_SECONDS", "60")),
+    max_streams=int(os.getenv("MAX_LIVE_STREAMS", "4"))
+)
+search_index = SearchIndex(index_path=SEARCH_INDEX_PATH)
+decoding_policy = DecodingPolicy(
+    temperatures=tuple(float(t) for t in os.getenv("WHISPER_TEMPERATURES", "0.0,0.4,0.8").split(",")),
+    beam_size=int(os.getenv("WHISPER_BEAM_SIZE", "0")) or None,
+    best_of=int(os.getenv("WHISPER_BEST_OF", "0")) or None
 )
 
-@app.post("/documents")
+router = APIRouter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Connect storage at startup, load the search index and optionally warm the
+    speech model in the background. The search index is snapshotted on shutdown.
+    """
+    services.storage
+    # Workers share the index files; without a readable snapshot one worker
+    # builds it from the stored corpus while startup continues
+    threading.Thread(
+        target=search_index.load_or_rebuild,
+        args=(lambda: services.storage.document_ref.get() or {},),
+        name="search-index-build",
+        daemon=True
+    ).start()
+    if os.getenv("WARM_MODEL", "1") == "1":
+        services.warm_up_in_background()
+    yield
+    search_index.save()
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application.
+    """
+    application = FastAPI(title="Document Processing API", version="1.0", lifespan=lifespan)
+
+    # Configure CORS
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Content-Length", "Content-Range", "Content-Type", "Accept-Ranges"]
+    )
+
+    application.include_router(router)
+
+    # Static files serving
+    application.mount("/static", StaticFiles(directory="static"), name="static")
+    return application
+
+@router.get("/healthz")
+async def liveness_probe():
+    """
+    Report that the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readiness_probe():
+    """
+    Report whether the speech model is loaded and recordings can be processed.
+    """
+    if not services.model_ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "loading", "error": services.model_error}
+        )
+    return {"status": "ready"}
+
+@router.post("/documents")
 async def upload_document(
     file: Optional[UploadFile] = File(None),
     text_content: Optional[str] = Form(None),
@@ -54,26 +140,46 @@ async def upload_document(
 
         new_doc_id = shortuuid.uuid()
 
+        # Identical uploads reuse the parsed text and the stored PDF
         if text_content:
-            # Process text input
-            pdf_data = doc_handler.create_pdf_from_text(text_content)
-            extracted_text = text_content
+            content_hash = services.content_index.hash_content("text", text_content.encode("utf-8"))
         else:
-            # Process file upload
             file_data = await file.read()
-            extracted_text = doc_handler.get_text_from_pdf(file_data)
-            pdf_data = file_data
+            content_hash = services.content_index.hash_content("pdf", file_data)
+        existing = services.content_index.find_document(content_hash)
+
+        pdf_content = None
+        if existing:
+            extracted_text = existing.get("text_content", "")
+            language = existing.get("language")
+        else:
+            if text_content:
+                # Process text input
+                pdf_data = doc_handler.create_pdf_from_text(text_content)
+                extracted_text = text_content
+            else:
+                # Process file upload
+                extracted_text = doc_handler.get_text_from_pdf(file_data)
+                pdf_data = file_data
+            pdf_content = doc_handler.convert_to_base64(pdf_data)
+            language = doc_handler.detect_language(extracted_text)
 
-        # Prepare document data for storage
+        # Prepare document data for storage; the PDF lives in a shared blob
         doc_data = {
-            "pdf_content": doc_handler.convert_to_base64(pdf_data),
+            "content_hash": content_hash,
             "text_content": extracted_text,
             "user_id": user_identifier,
-            "audio_recordings": {}
+            "language": language,
+            "recording_count": 0
         }
 
-        document_storage.store_document(doc_data, new_doc_id)
-        return {"document_id": new_doc_id}
+        services.storage.store_document(doc_data, new_doc_id)
+        if not services.content_index.register_document(content_hash, new_doc_id, pdf_content):
+            # The matching blob was deleted meanwhile, so its PDF has to be rebuilt
+            pdf_data = file_data if not text_content else doc_handler.create_pdf_from_text(text_content)
+            services.content_index.store_document_pdf(content_hash, new_doc_id, doc_handler.convert_to_base64(pdf_data))
+        await run_in_threadpool(search_index.add_document, new_doc_id, extracted_text, user_identifier)
+        return {"document_id": new_doc_id, "duplicate": existing is not None}
 
     except HTTPException:
         raise
@@ -83,8 +189,9 @@ async def upload_document(
             detail=f"Document processing failed: {str(error)}"
         )
 
-@app.get("/documents")
+@router.get("/documents")
 async def list_documents(
+    request: Request,
     page_number: int = 1,
     items_per_page: int = 10,
     user_identifier: Optional[str] = None,
@@ -94,7 +201,7 @@ async def list_documents(
     Retrieve paginated list of documents, optionally filtered by user.
     """
     try:
-        all_documents = document_storage.document_ref.get() or {}
+        all_documents = services.storage.document_ref.get() or {}
         document_list = []
 
         for doc_id, doc_data in all_documents.items():
@@ -107,44 +214,71 @@ async def list_documents(
         start_index = (page_number - 1) * items_per_page
         end_index = start_index + items_per_page
 
-        return {
+        return json_response(request, {
             "current_page": page_number,
             "page_size": items_per_page,
             "total_documents": total_documents,
             "documents": document_list[start_index:end_index]
-        }
+        })
     except Exception as error:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve documents: {str(error)}"
         )
 
-@app.post("/recordings/{document_id}")
-async def upload_recording(
-    document_id: str,
-    audio_file: UploadFile = File(...),
-    uploader_id: str = Form(...)
+@router.get("/documents/search")
+async def search_documents(
+    query: str,
+    limit: int = 10,
+    user_identifier: Optional[str] = None,
+    user_only: bool = False
 ):
     """
-    Process audio recordings for a specific document.
-    Stores the recording as .wav locally and saves the file path in the database.
-    Returns transcription data.
+    Full-text search over document text, ranked by BM25 with prefix matching.
     """
     try:
-        # Retrieve the original document
-        document_data = document_storage.fetch_document(document_id)
-        original_text = document_data.get("text_content", "")
+        results = await run_in_threadpool(
+            search_index.search,
+            query,
+            limit=limit,
+            user_id=user_identifier if user_only else None
+        )
+        return {"query": query, "total_results": len(results), "documents": results}
+    except Exception as error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Search failed: {str(error)}"
+        )
 
-        # Process the audio file
-        audio_data = await audio_file.read()
-        transcription_result = audio_handler.process_audio(audio_data, audio_file.filename)
+def store_transcribed_recording(
+    document_id: str,
+    uploader_id: str,
+    document_data: Dict,
+    transcription_result: Dict,
+    audio_hash: Optional[str] = None
+) -> Dict:
+    """
+    Check a finished transcription against the document, move its .wav into
+    storage and save the recording. Shared by uploads and live streams.
+    Results reused from an identical upload already carry a stored `audio_path`.
+    """
+    original_text = document_data.get("text_content", "")
 
-        # Check content similarity
-        is_semantically_valid = content_checker.check_content_similarity(
-            original_text,
-            transcription_result["text"]
+    # Remember the detected language so later recordings skip detection
+    if not document_data.get("language") and transcription_result["language"]:
+        services.storage.update_document(
+            document_id, {"language": transcription_result["language"]}
         )
 
+    # Check content similarity
+    is_semantically_valid = content_checker.check_content_similarity(
+        original_text,
+        transcription_result["text"]
+    )
+
+    if transcription_result.get("audio_path"):
+        audio_path = transcription_result["audio_path"]
+    else:
         # Save audio file as .wav
         audio_filename = f"{shortuuid.uuid()}.wav"
         audio_path = os.path.join(AUDIO_STORAGE_PATH, audio_filename)
@@ -158,22 +292,92 @@ async def upload_recording(
                 except Exception:
                     continue
 
-        # Prepare recording data with file path
-        recording_data = {
-            "audio_path": audio_path,  # Accessible via /static/audiorecordings/
-            "uploader_id": uploader_id,
-            "transcribed_text": transcription_result["text"],
-            "word_timings": transcription_result["segments"],
-            "content_match": is_semantically_valid
-        }
+    # Prepare recording data with file path
+    recording_data = {
+        "audio_path": audio_path,  # Accessible via /static/audiorecordings/
+        "uploader_id": uploader_id,
+        "transcribed_text": transcription_result["text"],
+        "word_timings": transcription_result["segments"],
+        "content_match": is_semantically_valid,
+        "fallback_windows": transcription_result["fallback_windows"],
+        "created_at": time.time()
+    }
+    recording_data["metrics"] = recording_metrics(recording_data["word_timings"], is_semantically_valid)
+    if audio_hash:
+        recording_data["audio_hash"] = audio_hash
 
-        # Store recording and return results
-        recording_id = document_storage.add_audio_recording(document_id, recording_data)
-        return {
-            "document_id": document_id,
-            "recording_id": recording_id,
-            "content_match": is_semantically_valid
-        }
+    # Store recording and return results
+    recording_id = services.storage.add_audio_recording(document_id, recording_data)
+    if audio_hash:
+        services.content_index.register_audio(audio_hash, recording_data, transcription_result["language"])
+    services.reading_analytics.record(
+        document_id, uploader_id, recording_data["metrics"], recording_data["created_at"]
+    )
+    return {
+        "document_id": document_id,
+        "recording_id": recording_id,
+        "content_match": is_semantically_valid
+    }
+
+@router.post("/recordings/{document_id}")
+async def upload_recording(
+    document_id: str,
+    audio_file: UploadFile = File(...),
+    uploader_id: str = Form(...)
+):
+    """
+    Process audio recordings for a specific document.
+    Stores the recording as .wav locally and saves the file path in the database.
+    Returns transcription data.
+    Requests over the transcription capacity are rejected with 429 or 503 and Retry-After.
+    """
+    try:
+        admitted_at = await admission.acquire(uploader_id)
+    except AdmissionRejected as rejection:
+        raise HTTPException(
+            status_code=rejection.status_code,
+            detail=str(rejection),
+            headers=rejection.headers()
+        )
+
+    try:
+        # Retrieve only the parts of the original document needed for decoding
+        document_data = services.storage.fetch_document_fields(document_id, ["text_content", "language"])
+        original_text = document_data.get("text_content", "")
+
+        # Derive decoding options from the document and the uploader's last recording
+        previous_recordings = [
+            (rec_id, summary)
+            for rec_id, summary in services.storage.all_recording_summaries(document_id).items()
+            if summary.get("uploader_id") == uploader_id
+        ]
+        previous_transcript = None
+        if previous_recordings:
+            latest_id, _ = max(previous_recordings, key=lambda item: item[1].get("created_at", 0))
+            previous_transcript = services.storage.fetch_recording(document_id, latest_id).get("transcribed_text")
+        decode_options = decoding_policy.build_options(
+            original_text, document_data.get("language"), previous_transcript
+        )
+
+        # Byte-identical audio reuses the stored file and transcript
+        audio_data = await audio_file.read()
+        audio_hash = services.content_index.hash_content("audio", audio_data)
+        reused = services.content_index.find_audio(audio_hash)
+        if reused:
+            transcription_result = {
+                **reused, "fallback_windows": 0, "wav_path": None, "temp_input_path": None
+            }
+        else:
+            # Process the audio file, waiting for the model if it is still loading
+            audio_handler = await run_in_threadpool(services.get_audio_processor)
+            transcription_result = await run_in_threadpool(
+                audio_handler.process_audio, audio_data, audio_file.filename, decode_options
+            )
+
+        return await run_in_threadpool(
+            store_transcribed_recording,
+            document_id, uploader_id, document_data, transcription_result, audio_hash
+        )
 
     except ValueError as error:
         raise HTTPException(status_code=404, detail=str(error))
@@ -182,16 +386,132 @@ async def upload_recording(
             status_code=500,
             detail=f"Audio processing failed: {str(error)}"
         )
+    finally:
+        admission.release(uploader_id, admitted_at)
 
-@app.get("/documents/{document_id}")
-async def get_document_details(document_id: str):
+@router.websocket("/ws/recordings/{document_id}")
+async def stream_recording(websocket: WebSocket, document_id: str, uploader_id: str):
     """
-    Retrieve complete details for a specific document.
+    Live transcription of a recording as it is read.
+    The client sends 16 kHz mono 16-bit PCM as binary messages and the text
+    message "stop" when done. The server answers with "partial" messages
+    (newly committed and tentative words with timestamps plus reading
+    progress) and a "final" message once the recording is stored.
     """
+    await websocket.accept()
+    try:
+        admission.open_stream(uploader_id)
+    except AdmissionRejected as rejection:
+        await websocket.send_json({
+            "type": "error", "detail": str(rejection), "retry_after": int(rejection.headers()["Retry-After"])
+        })
+        await websocket.close(code=1013)
+        return
+
+    wav_path = None
     try:
-        doc_data = document_storage.fetch_document(document_id)
+        try:
+            document_data = services.storage.fetch_document_fields(document_id, ["text_content", "language"])
+        except ValueError as error:
+            await websocket.send_json({"type": "error", "detail": str(error)})
+            await websocket.close(code=4404)
+            return
+
+        audio_handler = await run_in_threadpool(services.get_audio_processor)
+        original_text = document_data.get("text_content", "")
+        session = StreamingTranscriber(
+            audio_handler,
+            original_text,
+            decoding_policy.build_options(original_text, document_data.get("language"))
+        )
+        await websocket.send_json({"type": "ready"})
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return  # Abandoned streams are discarded
+            if message.get("bytes"):
+                try:
+                    decode_due = session.add_chunk(message["bytes"])
+                except ValueError as error:
+                    await websocket.send_json({"type": "error", "detail": str(error)})
+                    break
+                if decode_due:
+                    update = await run_stream_step(session.decode_partial)
+                    await websocket.send_json({"type": "partial", **update})
+            elif message.get("text") == "stop":
+                break
+
+        if not session.sample_count:
+            await websocket.send_json({"type": "error", "detail": "No audio received"})
+            await websocket.close()
+            return
+
+        wav_path = f"temp_{shortuuid.uuid()}.wav"
+        transcription_result = await run_stream_step(session.finalize, wav_path)
+        result = await run_in_threadpool(
+            store_transcribed_recording, document_id, uploader_id, document_data, transcription_result
+        )
+        await websocket.send_json({"type": "final", "progress": session.tracker.progress(), **result})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as error:
+        try:
+            await websocket.send_json({"type": "error", "detail": f"Live transcription failed: {str(error)}"})
+            await websocket.close(code=1011)
+        except Exception:
+            pass  # The client is already gone
+    finally:
+        admission.close_stream(uploader_id)
+        # store_transcribed_recording copies and removes the temporary file on success
+        if wav_path and os.path.exists(wav_path):
+            os.remove(wav_path)
+
+async def run_stream_step(function, *args):
+    """
+    Run a model call of a live stream in the transcription queue, so streams
+    and uploads share the model in turn and count toward the wait estimate.
+    """
+    admitted_at = await admission.acquire_step()
+    try:
+        return await run_in_threadpool(function, *args)
+    finally:
+        admission.release_step(admitted_at)
+
+@router.get("/status/transcription")
+async def get_transcription_status():
+    """
+    Report current transcription load and the estimated wait for a new recording.
+    """
+    return admission.snapshot()
+
+@router.get("/documents/{document_id}")
+async def get_document_details(document_id: str, request: Request, fields: Optional[str] = None):
+    """
+    Retrieve details for a specific document.
+    Supports conditional GET via ETag/If-None-Match and a comma-separated
+    `fields` projection; large responses are compressed.
+    """
+    try:
+        requested_fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else []
+        unknown_fields = sorted(set(requested_fields) - set(DOCUMENT_FIELDS))
+        if unknown_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown_fields)}")
+
+        revision = services.storage.fetch_revision(document_id)
+        headers = revision_headers(revision)
+        if etag_matches(request, headers.get("ETag")):
+            return not_modified(headers)
+
+        if requested_fields:
+            doc_data = services.storage.fetch_document_fields(document_id, requested_fields)
+        else:
+            doc_data = services.storage.fetch_document(document_id)
         doc_data["document_id"] = document_id
-        return doc_data
+        return json_response(request, doc_data, headers)
+    except HTTPException:
+        raise
     except ValueError as error:
         raise HTTPException(status_code=404, detail=str(error))
     except Exception as error:
@@ -200,23 +520,140 @@ async def get_document_details(document_id: str):
             detail=f"Failed to retrieve document: {str(error)}"
         )
 
-@app.get("/recordings/{document_id}/{recording_id}")
+@router.delete("/documents/{document_id}")
+async def delete_document(document_id: str, user_identifier: str):
+    """
+    Delete a document owned by the user together with its recordings.
+    Shared PDF blobs and audio files are released by reference count.
+    """
+    try:
+        doc_data = services.storage.fetch_document_fields(document_id, ["user_id", "content_hash"])
+        if doc_data.get("user_id") != user_identifier:
+            raise HTTPException(status_code=403, detail="Only the uploader can delete this document")
+
+        deleted_recordings = services.storage.delete_document(document_id)
+        for recording in deleted_recordings.values():
+            services.content_index.release_audio(recording["audio_hash"], recording["audio_path"])
+            if recording["metrics"] and recording["uploader_id"]:
+                services.reading_analytics.remove(
+                    document_id, recording["uploader_id"], recording["metrics"], recording["created_at"] or 0
+                )
+        if doc_data.get("content_hash"):
+            services.content_index.release_document(doc_data["content_hash"])
+        await run_in_threadpool(search_index.remove_document, document_id)
+
+        return {"document_id": document_id, "deleted_recordings": len(deleted_recordings)}
+    except HTTPException:
+        raise
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    except Exception as error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to delete document: {str(error)}"
+        )
+
+@router.get("/documents/{document_id}/recordings")
+async def list_document_recordings(
+    document_id: str,
+    limit: int = 5,
+    cursor: Optional[str] = None
+):
+    """
+    Retrieve a page of recording summaries for a document using cursor pagination.
+    """
+    try:
+        doc_data = services.storage.fetch_document_fields(document_id, ["user_id", "recording_count"])
+        summaries, next_cursor = services.storage.list_recording_summaries(
+            document_id, max(1, min(limit, 100)), cursor
+        )
+        return {
+            "document_id": document_id,
+            "total_recordings": doc_data.get("recording_count", 0),
+            "next_cursor": next_cursor,
+            "recordings": [
+                {"recording_id": rec_id, **summary} for rec_id, summary in summaries.items()
+            ]
+        }
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    except Exception as error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve recordings: {str(error)}"
+        )
+
+@router.get("/documents/{document_id}/export")
+async def export_document(document_id: str):
+    """
+    Stream a ZIP archive with the document PDF, text, audio files and transcripts.
+    """
+    try:
+        services.storage.fetch_document_fields(document_id, ["user_id"])
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+    return StreamingResponse(
+        stream_archive(services.storage, [document_id]),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="document_{document_id}.zip"'}
+    )
+
+@router.get("/users/{user_id}/export")
+async def export_user_documents(user_id: str):
+    """
+    Stream a ZIP archive of every document uploaded by a user, one folder per document.
+    """
+    document_ids = services.storage.list_user_document_ids(user_id)
+    if not document_ids:
+        raise HTTPException(status_code=404, detail="No documents found for user")
+
+    return StreamingResponse(
+        stream_archive(services.storage, document_ids, nested=True),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="user_{user_id}_export.zip"'}
+    )
+
+@router.get("/documents/{document_id}/stats")
+async def get_document_stats(document_id: str):
+    """
+    Reading statistics for a document, served from its maintained aggregate.
+    """
+    try:
+        return {"document_id": document_id, **services.reading_analytics.document_stats(document_id)}
+    except Exception as error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve statistics: {str(error)}"
+        )
+
+@router.get("/users/{user_id}/stats")
+async def get_user_stats(user_id: str):
+    """
+    Reading statistics for a user, served from their maintained aggregate.
+    """
+    try:
+        return {"user_id": user_id, **services.reading_analytics.user_stats(user_id)}
+    except Exception as error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve statistics: {str(error)}"
+        )
+
+@router.get("/recordings/{document_id}/{recording_id}")
 async def get_recording_details(document_id: str, recording_id: str):
     """
     Retrieve specific recording details for a document.
     """
     try:
-        doc_data = document_storage.fetch_document(document_id)
-        recordings = doc_data.get("audio_recordings", {})
-
-        if recording_id not in recordings:
-            raise HTTPException(status_code=404, detail="Recording not found")
+        recording = services.storage.fetch_recording(document_id, recording_id)
+        doc_data = services.storage.fetch_document_fields(document_id, ["text_content"])
 
         return {
+            **recording,
             "document_id": document_id,
             "recording_id": recording_id,
-            "original_text": doc_data.get("text_content", ""),
-            **recordings[recording_id]
+            "original_text": doc_data.get("text_content", "")
         }
     except ValueError as error:
         raise HTTPException(status_code=404, detail=str(error))
@@ -226,12 +663,27 @@ async def get_recording_details(document_id: str, recording_id: str):
             detail=f"Failed to retrieve recording: {str(error)}"
         )
 
-# Static files serving
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@router.get("/stats/decoding")
+async def get_decoding_stats():
+    """
+    Report how often decoding fell back to higher temperatures.
+    """
+    audio_handler = services.loaded_audio_processor()
+    if audio_handler is None:
+        raise HTTPException(status_code=503, detail="Speech model is not loaded yet")
 
-@app.get("/telegram_miniapp.html")
+    stats = dict(audio_handler.decoding_stats)
+    stats["fallback_rate"] = stats["fallback_windows"] / stats["windows"] if stats["windows"] else 0.0
+    stats["average_decode_seconds"] = (
+        stats["decode_seconds"] / stats["transcriptions"] if stats["transcriptions"] else 0.0
+    )
+    return stats
+
+@router.get("/telegram_miniapp.html")
 async def serve_telegram_app():
     """
     Serve the Telegram mini-app interface.
     """
-    return FileResponse("../outsiders/telegram_miniapp.html")
\ No newline at end of file
+    return FileResponse("../outsiders/telegram_miniapp.html")
+
+app = create_app()
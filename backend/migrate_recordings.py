@@ -0,0 +1,18 @@
+"""
+Move recordings nested under documents into per-recording records, give
+unversioned documents a revision and index existing documents by uploader.
+
+Usage: python migrate_recordings.py <credential_path> <database_url>
+"""
+import sys
+from database_manager import DatabaseManager
+
+
+if __name__ == "__main__":
+    storage = DatabaseManager(credential_path=sys.argv[1], database_url=sys.argv[2])
+    moved = storage.migrate_nested_recordings()
+    print(f"Migrated {moved} recordings")
+    stamped = storage.stamp_revisions()
+    print(f"Added revisions to {stamped} documents")
+    indexed = storage.backfill_user_documents()
+    print(f"Indexed {indexed} documents by uploader")
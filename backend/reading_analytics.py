@@ -0,0 +1,143 @@
+import time
+import numpy as np
+from typing import Dict, List, Optional
+from database_manager import DatabaseManager
+
+PAUSE_SECONDS = 0.5
+LONG_PAUSE_SECONDS = 2.0
+
+
+def recording_metrics(word_timings: List[Dict], content_match: bool) -> Dict:
+    """Compute reading metrics for one recording from its word timings."""
+    if not word_timings:
+        return {
+            "words": 0, "speaking_seconds": 0.0, "words_per_minute": 0.0,
+            "pauses": 0, "long_pauses": 0, "pause_seconds": 0.0,
+            "content_match": bool(content_match)
+        }
+
+    starts = np.fromiter((word["start"] for word in word_timings), dtype=np.float64, count=len(word_timings))
+    ends = np.fromiter((word["end"] for word in word_timings), dtype=np.float64, count=len(word_timings))
+    speaking_seconds = float(max(ends.max() - starts.min(), 0.0))
+    gaps = starts[1:] - ends[:-1]
+    pauses = gaps[gaps >= PAUSE_SECONDS]
+
+    return {
+        "words": len(word_timings),
+        "speaking_seconds": round(speaking_seconds, 3),
+        "words_per_minute": round(len(word_timings) * 60 / speaking_seconds, 2) if speaking_seconds else 0.0,
+        "pauses": int(pauses.size),
+        "long_pauses": int(np.count_nonzero(pauses >= LONG_PAUSE_SECONDS)),
+        "pause_seconds": round(float(pauses.sum()), 3),
+        "content_match": bool(content_match)
+    }
+
+
+def _merge(aggregate: Optional[Dict], metrics: Dict, created_at: float, sign: int = 1) -> Dict:
+    """Add (or with sign=-1, remove) one recording's metrics to a running aggregate."""
+    aggregate = dict(aggregate or {})
+    matched = 1 if metrics["content_match"] else 0
+    for key, value in (("recordings", 1), ("matched_recordings", matched), ("words", metrics["words"]),
+                       ("speaking_seconds", metrics["speaking_seconds"]), ("pauses", metrics["pauses"]),
+                       ("long_pauses", metrics["long_pauses"]), ("pause_seconds", metrics["pause_seconds"])):
+        aggregate[key] = round(aggregate.get(key, 0) + sign * value, 3)
+
+    # Daily buckets give match rate and speed over time
+    day = time.strftime("%Y-%m-%d", time.gmtime(created_at))
+    daily = dict(aggregate.get("daily") or {})
+    bucket = dict(daily.get(day) or {})
+    for key, value in (("recordings", 1), ("matched_recordings", matched), ("words", metrics["words"]),
+                       ("speaking_seconds", metrics["speaking_seconds"])):
+        bucket[key] = round(bucket.get(key, 0) + sign * value, 3)
+    if bucket["recordings"] > 0:
+        daily[day] = bucket
+    else:
+        daily.pop(day, None)
+    aggregate["daily"] = daily
+
+    if sign > 0:
+        aggregate["last_recording_at"] = max(aggregate.get("last_recording_at", 0), created_at)
+    return aggregate
+
+
+def summarize(aggregate: Optional[Dict]) -> Dict:
+    """Derive rates from a stored aggregate."""
+    aggregate = aggregate or {}
+    recordings = aggregate.get("recordings", 0)
+    speaking_seconds = aggregate.get("speaking_seconds", 0)
+
+    def rates(bucket: Dict) -> Dict:
+        seconds = bucket.get("speaking_seconds", 0)
+        return {
+            "recordings": bucket.get("recordings", 0),
+            "words_per_minute": round(bucket.get("words", 0) * 60 / seconds, 2) if seconds else 0.0,
+            "match_rate": round(bucket.get("matched_recordings", 0) / bucket["recordings"], 4)
+            if bucket.get("recordings") else 0.0
+        }
+
+    overall = rates(aggregate)
+    return {
+        "recordings": recordings,
+        "words": aggregate.get("words", 0),
+        "speaking_seconds": speaking_seconds,
+        "words_per_minute": overall["words_per_minute"],
+        "match_rate": overall["match_rate"],
+        "pauses": aggregate.get("pauses", 0),
+        "long_pauses": aggregate.get("long_pauses", 0),
+        "pauses_per_minute": round(aggregate.get("pauses", 0) * 60 / speaking_seconds, 2) if speaking_seconds else 0.0,
+        "last_recording_at": aggregate.get("last_recording_at"),
+        "daily": {day: rates(bucket) for day, bucket in sorted((aggregate.get("daily") or {}).items())}
+    }
+
+
+class ReadingAnalytics:
+    """Maintains per-user and per-document reading aggregates in the database."""
+
+    def __init__(self, storage: DatabaseManager):
+        self.storage = storage
+        self.user_stats_ref = storage.reading_stats_ref.child("users")
+        self.document_stats_ref = storage.reading_stats_ref.child("documents")
+
+    def record(self, doc_id: str, uploader_id: str, metrics: Dict, created_at: float) -> None:
+        """Fold a new recording into the user and document aggregates."""
+        for ref in (self.user_stats_ref.child(uploader_id), self.document_stats_ref.child(doc_id)):
+            ref.transaction(lambda aggregate: _merge(aggregate, metrics, created_at))
+
+    def remove(self, doc_id: str, uploader_id: str, metrics: Dict, created_at: float) -> None:
+        """Take a deleted recording out of the user aggregate; the document's is dropped."""
+        self.user_stats_ref.child(uploader_id).transaction(
+            lambda aggregate: _merge(aggregate, metrics, created_at, sign=-1)
+        )
+        self.document_stats_ref.child(doc_id).delete()
+
+    def user_stats(self, user_id: str) -> Dict:
+        return summarize(self.user_stats_ref.child(user_id).get())
+
+    def document_stats(self, doc_id: str) -> Dict:
+        return summarize(self.document_stats_ref.child(doc_id).get())
+
+    def backfill(self) -> int:
+        """
+        Recompute metrics for every stored recording and rebuild all aggregates.
+        Returns the number of recordings processed.
+        """
+        user_aggregates: Dict[str, Dict] = {}
+        document_aggregates: Dict[str, Dict] = {}
+        processed = 0
+        for recording_id in self.storage.recording_ref.get(shallow=True) or {}:
+            recording = self.storage.recording_ref.child(recording_id).get()
+            if not recording:
+                continue
+            metrics = recording_metrics(recording.get("word_timings") or [], recording.get("content_match"))
+            created_at = recording.get("created_at", 0)
+            self.storage.recording_ref.child(recording_id).update({"metrics": metrics})
+
+            uploader_id = recording.get("uploader_id")
+            if uploader_id:
+                user_aggregates[uploader_id] = _merge(user_aggregates.get(uploader_id), metrics, created_at)
+            doc_id = recording["document_id"]
+            document_aggregates[doc_id] = _merge(document_aggregates.get(doc_id), metrics, created_at)
+            processed += 1
+
+        self.storage.reading_stats_ref.set({"users": user_aggregates, "documents": document_aggregates})
+        return processed
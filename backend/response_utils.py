@@ -0,0 +1,60 @@
+import gzip
+import json
+from email.utils import formatdate
+from typing import Any, Dict, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_BYTES = 1024
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Check If-None-Match against an ETag using weak comparison."""
+    if not etag:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def revision_headers(revision: Optional[Dict]) -> Dict[str, str]:
+    """Build ETag and Last-Modified headers from a stored revision."""
+    if not revision:
+        return {}
+    headers = {"ETag": f'W/"{revision["etag"]}"', "Cache-Control": "no-cache"}
+    if revision.get("updated_at"):
+        headers["Last-Modified"] = formatdate(revision["updated_at"], usegmt=True)
+    return headers
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """Return an empty 304 response carrying the validators."""
+    return Response(status_code=304, headers=headers)
+
+
+def json_response(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize JSON once and compress it when the client accepts it and it is large enough."""
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        accepted = request.headers.get("accept-encoding", "")
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=5)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
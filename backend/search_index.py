@@ -0,0 +1,484 @@
+import bisect
+import fcntl
+import heapq
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over document text with BM25 ranking.
+    Each worker process keeps its own copy. Changes are appended to a shared,
+    file-locked journal that every process replays before reading, so all
+    workers see every upload; compaction folds the journal into a snapshot.
+    """
+
+    def __init__(self, index_path: Optional[str] = None, compact_every: int = 5000,
+                 k1: float = 1.2, b: float = 0.75, max_prefix_terms: int = 50,
+                 max_scan_postings: int = 2000, impact_drift: float = 0.05):
+        self.index_path = index_path
+        self.journal_path = f"{index_path}.journal" if index_path else None
+        self.lock_path = f"{index_path}.lock" if index_path else None
+        self.build_lock_path = f"{index_path}.build.lock" if index_path else None
+        self.compact_every = compact_every
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self.max_scan_postings = max_scan_postings
+        self.impact_drift = impact_drift
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_meta: Dict[str, Dict] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._sorted_terms: List[str] = []
+        self._total_length = 0
+        # term -> (average length used, impact-ordered postings) for frequent terms
+        self._impact_cache: Dict[str, Tuple[float, List[Tuple[float, str]]]] = {}
+        # Position in the shared files this process has caught up to
+        self._snapshot_id: Optional[Tuple[int, int, int]] = None
+        self._snapshot_readable = False
+        self._journal_offset = 0
+        self._journal_entries = 0
+        # Changes applied while a rebuild reads the corpus, replayed onto its result
+        self._building: Optional[List[tuple]] = None
+        self._lock = threading.RLock()
+        self._build_thread_lock = threading.Lock()
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Split text into lowercase word tokens."""
+        return re.findall(r'\w+', text.lower()) if text else []
+
+    @classmethod
+    def _count_terms(cls, text: str) -> Tuple[int, Dict[str, int]]:
+        """Return the token count and per-term frequencies of a text."""
+        tokens = cls.tokenize(text)
+        term_counts: Dict[str, int] = {}
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+        return len(tokens), term_counts
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    @contextmanager
+    def _file_lock(self, path: Optional[str], exclusive: bool) -> Iterator[None]:
+        """Hold an advisory lock on a file shared by all worker processes."""
+        if not path:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _shared_state(self, exclusive: bool) -> Iterator[None]:
+        """Lock the index in this process and across processes, then catch up."""
+        with self._lock, self._file_lock(self.lock_path, exclusive):
+            self._catch_up(repair=exclusive)
+            yield
+
+    def add_document(self, doc_id: str, text: str, user_id: Optional[str] = None) -> None:
+        """Index a document, replacing any previous version of it."""
+        entry = ("add", doc_id, text, user_id)
+        with self._shared_state(exclusive=True):
+            self._apply(entry)
+            self._record(entry)
+
+    def remove_document(self, doc_id: str) -> None:
+        """Drop a document from the index."""
+        entry = ("remove", doc_id)
+        with self._shared_state(exclusive=True):
+            if doc_id in self._doc_lengths:
+                self._apply(entry)
+                self._record(entry)
+
+    def _apply(self, entry: tuple) -> None:
+        """Apply a change to the in-memory index without journaling it."""
+        if entry[0] == "add":
+            self._add(*entry[1:])
+        else:
+            self._remove(entry[1])
+        if self._building is not None:
+            self._building.append(entry)
+
+    def _add(self, doc_id: str, text: str, user_id: Optional[str]) -> None:
+        length, term_counts = self._count_terms(text)
+        self._remove(doc_id)
+        for term, count in term_counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._sorted_terms, term)
+            postings[doc_id] = count
+            cached = self._impact_cache.get(term)
+            if cached:
+                bisect.insort(cached[1], (-self._term_score(count, length, cached[0]), doc_id))
+        self._doc_lengths[doc_id] = length
+        self._doc_terms[doc_id] = list(term_counts)
+        self._doc_meta[doc_id] = {"user_id": user_id, "preview": (text or "")[:200]}
+        self._total_length += length
+
+    def _remove(self, doc_id: str) -> bool:
+        if doc_id not in self._doc_lengths:
+            return False
+        length = self._doc_lengths[doc_id]
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            frequency = postings.pop(doc_id)
+            cached = self._impact_cache.get(term)
+            if cached:
+                impacts = cached[1]
+                entry = (-self._term_score(frequency, length, cached[0]), doc_id)
+                position = bisect.bisect_left(impacts, entry)
+                if position < len(impacts) and impacts[position] == entry:
+                    del impacts[position]
+                else:
+                    del self._impact_cache[term]
+            if not postings:
+                del self._postings[term]
+                self._impact_cache.pop(term, None)
+                position = bisect.bisect_left(self._sorted_terms, term)
+                del self._sorted_terms[position]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._doc_meta[doc_id]
+        return True
+
+    def _expand_term(self, term: str, prefix: bool) -> List[str]:
+        """Return the indexed terms matching a query term, including prefix matches."""
+        if not prefix:
+            return [term] if term in self._postings else []
+        matches = []
+        position = bisect.bisect_left(self._sorted_terms, term)
+        while (position < len(self._sorted_terms)
+               and self._sorted_terms[position].startswith(term)
+               and len(matches) < self.max_prefix_terms):
+            matches.append(self._sorted_terms[position])
+            position += 1
+        return matches
+
+    def _term_score(self, frequency: int, length: int, average_length: float) -> float:
+        """BM25 term-frequency component, before the term weight is applied."""
+        length_norm = 1 - self.b + self.b * length / average_length
+        return frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+    def _impacts(self, term: str, average_length: float) -> List[Tuple[float, str]]:
+        """
+        Postings of a frequent term ordered by score contribution, best first
+        (scores are negated so the list sorts ascending). Cached and kept up to
+        date on changes; rebuilt once the average length has drifted.
+        """
+        cached = self._impact_cache.get(term)
+        if cached is None or abs(cached[0] - average_length) > self.impact_drift * average_length:
+            impacts = sorted(
+                (-self._term_score(frequency, self._doc_lengths[doc_id], average_length), doc_id)
+                for doc_id, frequency in self._postings[term].items()
+            )
+            cached = self._impact_cache[term] = (average_length, impacts)
+        return cached[1]
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True,
+               user_id: Optional[str] = None) -> List[Dict]:
+        """
+        Return the best matching documents ranked by BM25.
+        Rare terms are scored in full. Frequent terms are walked in impact
+        order and the walk stops once no unseen document can reach the top
+        results, so common words do not cost a pass over the whole corpus.
+        """
+        query_terms = self.tokenize(query)
+        if not query_terms or limit <= 0:
+            return []
+
+        with self._lock:
+            # Scoring needs only this process's copy, not the file lock
+            with self._file_lock(self.lock_path, exclusive=False):
+                self._catch_up()
+            doc_count = len(self._doc_lengths)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+
+            weights: Dict[str, float] = {}
+            for query_term in query_terms:
+                for term in self._expand_term(query_term, prefix):
+                    document_frequency = len(self._postings[term])
+                    idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                    # Prefix expansions score lower than the exact term
+                    weights[term] = weights.get(term, 0.0) + (idf if term == query_term else idf * 0.5)
+            if not weights:
+                return []
+
+            rare = {term: weight for term, weight in weights.items()
+                    if len(self._postings[term]) <= self.max_scan_postings}
+            frequent = {term: weight for term, weight in weights.items() if term not in rare}
+
+            # Rare terms are accumulated posting by posting, as in a full scan
+            partial = self._accumulate(rare, {}, average_length, user_id)
+            lists = [(weight, self._impacts(term, average_length)) for term, weight in frequent.items()]
+            if len(partial) * len(lists) > sum(len(impacts) for _, impacts in lists):
+                # Completing that many partial scores one document at a time
+                # costs more than a plain pass over the frequent postings
+                scores = self._accumulate(frequent, partial, average_length, user_id)
+            else:
+                scores = self._complete_scores(partial, frequent, lists, limit, average_length, user_id)
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "document_id": doc_id,
+                    "score": round(score, 4),
+                    "user_id": self._doc_meta[doc_id]["user_id"],
+                    "preview": self._doc_meta[doc_id]["preview"]
+                }
+                for doc_id, score in best
+            ]
+
+    def _accumulate(self, weights: Dict[str, float], scores: Dict[str, float],
+                    average_length: float, user_id: Optional[str]) -> Dict[str, float]:
+        """Add the full contribution of each term to the scores of its documents."""
+        for term, weight in weights.items():
+            for doc_id, frequency in self._postings[term].items():
+                if user_id and self._doc_meta[doc_id]["user_id"] != user_id:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * self._term_score(
+                    frequency, self._doc_lengths[doc_id], average_length
+                )
+        return scores
+
+    def _complete_scores(self, partial: Dict[str, float], frequent: Dict[str, float],
+                         lists: List[Tuple[float, List[Tuple[float, str]]]], limit: int,
+                         average_length: float, user_id: Optional[str]) -> Dict[str, float]:
+        """
+        Add frequent terms to the partial scores, skipping every document that
+        cannot reach the top results. Returns the scores of the documents kept.
+        """
+        def frequent_score(doc_id: str) -> float:
+            length = self._doc_lengths[doc_id]
+            score = 0.0
+            for term, weight in frequent.items():
+                frequency = self._postings[term].get(doc_id)
+                if frequency:
+                    score += weight * self._term_score(frequency, length, average_length)
+            return score
+
+        scores: Dict[str, float] = {}
+        top: List[float] = []
+
+        def keep(doc_id: str, score: float) -> None:
+            scores[doc_id] = score
+            if len(top) < limit:
+                heapq.heappush(top, score)
+            elif score > top[0]:
+                heapq.heapreplace(top, score)
+
+        # Complete the best partial scores first; the rest cannot catch up
+        frequent_bound = sum(-weight * impacts[0][0] for weight, impacts in lists)
+        for doc_id, score in sorted(partial.items(), key=lambda item: item[1], reverse=True):
+            if len(top) >= limit and score + frequent_bound <= top[0]:
+                break
+            keep(doc_id, score + frequent_score(doc_id))
+
+        # Documents without a rare term can gain at most the next impact of
+        # each frequent term; walk those lists until that falls below the top results
+        positions = [0] * len(lists)
+        seen = set(partial)
+        while True:
+            bound = 0.0
+            remaining = False
+            for index, (weight, impacts) in enumerate(lists):
+                if positions[index] < len(impacts):
+                    bound -= weight * impacts[positions[index]][0]
+                    remaining = True
+            if not remaining or (len(top) >= limit and bound <= top[0]):
+                return scores
+            for index, (weight, impacts) in enumerate(lists):
+                if positions[index] >= len(impacts):
+                    continue
+                doc_id = impacts[positions[index]][1]
+                positions[index] += 1
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                if user_id and self._doc_meta[doc_id]["user_id"] != user_id:
+                    continue
+                keep(doc_id, frequent_score(doc_id))
+
+    @classmethod
+    def _build_state(cls, documents: Dict[str, Dict]) -> Dict:
+        """Build index structures for a whole corpus without touching the live index."""
+        state = {"postings": {}, "doc_lengths": {}, "doc_meta": {}, "doc_terms": {}, "total_length": 0}
+        for doc_id, doc_data in documents.items():
+            text = doc_data.get("text_content", "")
+            length, term_counts = cls._count_terms(text)
+            for term, count in term_counts.items():
+                state["postings"].setdefault(term, {})[doc_id] = count
+            state["doc_lengths"][doc_id] = length
+            state["doc_terms"][doc_id] = list(term_counts)
+            state["doc_meta"][doc_id] = {"user_id": doc_data.get("user_id"), "preview": (text or "")[:200]}
+            state["total_length"] += length
+        return state
+
+    def _state(self) -> Dict:
+        return {
+            "postings": self._postings,
+            "doc_lengths": self._doc_lengths,
+            "doc_meta": self._doc_meta,
+            "doc_terms": self._doc_terms,
+            "total_length": self._total_length
+        }
+
+    def _set_state(self, state: Dict) -> None:
+        """Swap in a complete set of index structures."""
+        self._postings = state["postings"]
+        self._doc_lengths = state["doc_lengths"]
+        self._doc_meta = state["doc_meta"]
+        self._doc_terms = state["doc_terms"]
+        self._total_length = state["total_length"]
+        self._sorted_terms = sorted(self._postings)
+        self._impact_cache = {}
+
+    def load_or_rebuild(self, load_documents: Callable[[], Dict[str, Dict]]) -> None:
+        """
+        Load the saved index, or rebuild it from storage if there is no readable
+        snapshot. Only one process builds; the others wait and load its result.
+        """
+        with self._build_thread_lock, self._file_lock(self.build_lock_path, exclusive=True):
+            if not self.load():
+                self._rebuild(load_documents)
+
+    def rebuild(self, load_documents: Callable[[], Dict[str, Dict]]) -> None:
+        """Replace the index contents with the documents returned by `load_documents`."""
+        with self._build_thread_lock, self._file_lock(self.build_lock_path, exclusive=True):
+            self._rebuild(load_documents)
+
+    def _rebuild(self, load_documents: Callable[[], Dict[str, Dict]]) -> None:
+        """
+        Read the corpus and build postings without holding the index lock.
+        Changes made meanwhile are collected and replayed onto the new index
+        before it is swapped in, so uploads during a rebuild are kept.
+        """
+        with self._shared_state(exclusive=True):
+            self._building = []
+        try:
+            state = self._build_state(load_documents())
+            with self._shared_state(exclusive=True):
+                changes, self._building = self._building, None
+                self._set_state(state)
+                for entry in changes:
+                    self._apply(entry)
+                self._compact()
+        finally:
+            self._building = None
+
+    def _build_in_progress(self) -> bool:
+        """Whether any process is rebuilding; compaction then waits so no change is lost."""
+        if self._building is not None:
+            return True
+        if not self.build_lock_path or not os.path.exists(self.build_lock_path):
+            return False
+        with open(self.build_lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+
+    @staticmethod
+    def _file_id(path: str) -> Optional[Tuple[int, int, int]]:
+        """Identify a snapshot file; replacing it changes the identity."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _catch_up(self, repair: bool = False) -> None:
+        """
+        Reload the snapshot if another process compacted, then replay journal
+        entries written since this process last read it. With `repair`, a torn
+        entry left by a crash is cut off so later appends stay readable.
+        """
+        if not self.index_path:
+            return
+        snapshot_id = self._file_id(self.index_path)
+        if snapshot_id != self._snapshot_id:
+            self._snapshot_readable = False
+            self._set_state(self._build_state({}))
+            if snapshot_id is not None:
+                try:
+                    with open(self.index_path, "rb") as index_file:
+                        self._set_state(pickle.load(index_file))
+                    self._snapshot_readable = True
+                except (EOFError, KeyError, ValueError, pickle.UnpicklingError):
+                    pass  # Left empty until a rebuild from storage replaces the file
+            self._snapshot_id = snapshot_id
+            self._journal_offset = 0
+            self._journal_entries = 0
+
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as journal_file:
+            journal_file.seek(self._journal_offset)
+            while True:
+                try:
+                    entry = pickle.load(journal_file)
+                except (EOFError, ValueError, pickle.UnpicklingError):
+                    break
+                self._apply(entry)
+                self._journal_offset = journal_file.tell()
+                self._journal_entries += 1
+        if repair and os.path.getsize(self.journal_path) > self._journal_offset:
+            os.truncate(self.journal_path, self._journal_offset)
+
+    def _record(self, entry: tuple) -> None:
+        """Persist a single change; the full snapshot is only rewritten on compaction."""
+        if not self.journal_path:
+            return
+        with open(self.journal_path, "ab") as journal_file:
+            pickle.dump(entry, journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._journal_offset = journal_file.tell()
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_every and not self._build_in_progress():
+            self._compact()
+
+    def _compact(self) -> None:
+        """Write a full snapshot atomically and start an empty journal."""
+        if not self.index_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp_file:
+            pickle.dump(self._state(), temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file.name, self.index_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._snapshot_id = self._file_id(self.index_path)
+        self._snapshot_readable = True
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def save(self) -> None:
+        """Fold the journal into the snapshot, unless a rebuild is running."""
+        if not self.index_path:
+            return
+        with self._shared_state(exclusive=True):
+            if not self._build_in_progress():
+                self._compact()
+
+    def load(self) -> bool:
+        """Load the saved snapshot and replay the journal, returning False if no snapshot can be read."""
+        if not self.index_path:
+            return False
+        with self._shared_state(exclusive=False):
+            return self._snapshot_readable
@@ -0,0 +1,88 @@
+import logging
+import threading
+from typing import Dict, Optional
+from database_manager import DatabaseManager
+from content_index import ContentIndex
+from reading_analytics import ReadingAnalytics
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Creates backend services on first use so the app can start without loading the model."""
+
+    def __init__(self, credential_path: str, database_url: str, engine_settings: Dict):
+        self._credential_path = credential_path
+        self._database_url = database_url
+        self._engine_settings = engine_settings
+        self._storage: Optional[DatabaseManager] = None
+        self._content_index: Optional[ContentIndex] = None
+        self._reading_analytics: Optional[ReadingAnalytics] = None
+        self._audio = None
+        self._storage_lock = threading.Lock()
+        self._audio_lock = threading.Lock()
+        self.model_error: Optional[str] = None
+
+    @property
+    def storage(self) -> DatabaseManager:
+        """Return the database manager, initializing Firebase on first access."""
+        if self._storage is None:
+            with self._storage_lock:
+                if self._storage is None:
+                    self._storage = DatabaseManager(
+                        credential_path=self._credential_path,
+                        database_url=self._database_url
+                    )
+        return self._storage
+
+    @property
+    def content_index(self) -> ContentIndex:
+        """Return the upload content index backed by the database."""
+        if self._content_index is None:
+            self._content_index = ContentIndex(self.storage)
+        return self._content_index
+
+    @property
+    def reading_analytics(self) -> ReadingAnalytics:
+        """Return the reading statistics aggregator backed by the database."""
+        if self._reading_analytics is None:
+            self._reading_analytics = ReadingAnalytics(self.storage)
+        return self._reading_analytics
+
+    @property
+    def model_ready(self) -> bool:
+        """Whether the speech model has finished loading."""
+        return self._audio is not None
+
+    def get_audio_processor(self):
+        """Return the audio processor, loading the speech model if needed."""
+        if self._audio is None:
+            with self._audio_lock:
+                if self._audio is None:
+                    # torch and whisper are imported only when the model is needed
+                    from audio_processor import AudioProcessor
+                    from inference_engine import InferenceEngine
+                    try:
+                        self._audio = AudioProcessor(engine=InferenceEngine(**self._engine_settings))
+                        self.model_error = None
+                    except Exception as error:
+                        self.model_error = str(error)
+                        raise
+        return self._audio
+
+    def loaded_audio_processor(self):
+        """Return the audio processor only if it is already loaded."""
+        return self._audio
+
+    def warm_up_in_background(self) -> threading.Thread:
+        """Load the speech model on a daemon thread."""
+        def warm_up():
+            try:
+                self.get_audio_processor()
+                logger.info("Speech model loaded")
+            except Exception as error:
+                logger.error("Speech model failed to load: %s", error)
+
+        thread = threading.Thread(target=warm_up, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
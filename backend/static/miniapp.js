@@ -2,6 +2,7 @@
 const API_BASE_URL = "";
 const HIGHLIGHT_COLOR = "#FFEB3B"; // Yellow highlight color
 const WORD_PADDING = 50; // ms padding around word timing
+const STREAM_SAMPLE_RATE = 16000; // Live recordings are sent as 16 kHz 16-bit PCM
 
 // DOM Elements
 const textContainer = document.getElementById("text-container");
@@ -9,12 +10,17 @@ const playButton = document.getElementById("play-button");
 const audioPlayer = document.getElementById("audio-player");
 const errorMessage = document.getElementById("error-message");
 const matchStatus = document.getElementById("match-status");
+const recordButton = document.getElementById("record-button");
+const liveTranscript = document.getElementById("live-transcript");
 
 // State
 let wordTimings = [];
 let currentWordIndex = 0;
 let words = [];
 let isPlaying = false;
+let liveSocket = null;
+let liveAudio = null;
+let committedText = "";
 
 // Initialize Telegram WebApp
 const tg = window.Telegram?.WebApp;
@@ -27,15 +33,25 @@ if (tg) {
 const urlParams = new URLSearchParams(window.location.search);
 const documentId = urlParams.get("document_id");
 const recordingId = urlParams.get("recording_id");
+const liveMode = urlParams.get("mode") === "live";
+const uploaderId = tg?.initDataUnsafe?.user?.id || urlParams.get("uploader_id");
 
 // Validate required parameters
-if (!documentId || !recordingId) {
+if (!documentId || (!liveMode && !recordingId)) {
     showError("Document ID and Recording ID are required.");
     throw new Error("Missing required parameters");
 }
 
-// Load recording data
-loadRecording(documentId, recordingId);
+if (liveMode) {
+    // Live reading: stream microphone audio and follow progress through the text
+    playButton.style.display = "none";
+    recordButton.style.display = "inline-block";
+    recordButton.addEventListener("click", toggleLiveRecording);
+    loadDocumentText(documentId);
+} else {
+    // Load recording data
+    loadRecording(documentId, recordingId);
+}
 
 // Play button handler
 playButton.addEventListener("click", togglePlayback);
@@ -193,4 +209,118 @@ function showError(message) {
     errorMessage.textContent = message;
     errorMessage.style.display = "block";
     playButton.disabled = true;
-}
\ No newline at end of file
+}
+
+// Load the document text for live reading
+async function loadDocumentText(docId) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/documents/${docId}?fields=text_content`);
+
+        if (!response.ok) {
+            throw new Error(`Server error: ${response.status}`);
+        }
+
+        const data = await response.json();
+        words = data.text_content.split(/\s+/);
+        renderText(words);
+        recordButton.disabled = false;
+
+    } catch (error) {
+        showError(`Failed to load text: ${error.message}`);
+        console.error("Loading error:", error);
+    }
+}
+
+async function toggleLiveRecording() {
+    if (liveSocket) {
+        stopLiveRecording();
+        return;
+    }
+
+    try {
+        const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+        const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+        const host = API_BASE_URL ? API_BASE_URL.replace(/^http/, "ws") : `${protocol}://${window.location.host}`;
+        liveSocket = new WebSocket(`${host}/ws/recordings/${documentId}?uploader_id=${encodeURIComponent(uploaderId)}`);
+        liveSocket.binaryType = "arraybuffer";
+        liveSocket.onmessage = onLiveMessage;
+        liveSocket.onclose = () => releaseMicrophone();
+        liveSocket.onopen = () => startMicrophone(stream);
+
+        committedText = "";
+        recordButton.textContent = "Stop";
+        matchStatus.textContent = "🎙 Listening...";
+    } catch (error) {
+        showError(`Microphone unavailable: ${error.message}`);
+    }
+}
+
+function startMicrophone(stream) {
+    const context = new AudioContext();
+    const source = context.createMediaStreamSource(stream);
+    const processor = context.createScriptProcessor(4096, 1, 1);
+
+    processor.onaudioprocess = (event) => {
+        if (liveSocket && liveSocket.readyState === WebSocket.OPEN) {
+            liveSocket.send(toPcm16(event.inputBuffer.getChannelData(0), context.sampleRate));
+        }
+    };
+    source.connect(processor);
+    processor.connect(context.destination);
+    liveAudio = { context, stream, processor };
+}
+
+// Downsample float samples to 16 kHz 16-bit PCM
+function toPcm16(samples, inputRate) {
+    const ratio = inputRate / STREAM_SAMPLE_RATE;
+    const output = new Int16Array(Math.floor(samples.length / ratio));
+    for (let i = 0; i < output.length; i++) {
+        const sample = Math.max(-1, Math.min(1, samples[Math.floor(i * ratio)]));
+        output[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+    }
+    return output.buffer;
+}
+
+function stopLiveRecording() {
+    releaseMicrophone();
+    if (liveSocket && liveSocket.readyState === WebSocket.OPEN) {
+        liveSocket.send("stop");
+    }
+    recordButton.disabled = true;
+    matchStatus.textContent = "⏳ Finishing...";
+}
+
+function releaseMicrophone() {
+    if (liveAudio) {
+        liveAudio.processor.disconnect();
+        liveAudio.stream.getTracks().forEach(track => track.stop());
+        liveAudio.context.close();
+        liveAudio = null;
+    }
+}
+
+function onLiveMessage(event) {
+    const message = JSON.parse(event.data);
+
+    if (message.type === "partial") {
+        committedText += message.committed.map(word => word.text).join("");
+        const tentativeText = message.tentative.map(word => word.text).join("");
+        liveTranscript.textContent = committedText + tentativeText;
+        showReadingProgress(message.progress);
+    } else if (message.type === "final") {
+        showReadingProgress(message.progress);
+        matchStatus.textContent = message.content_match ? "✅ Content matches" : "❌ Content doesn't match";
+        recordButton.textContent = "Saved";
+        liveSocket = null;
+    } else if (message.type === "error") {
+        showError(message.detail);
+    }
+}
+
+// Highlight every document word read so far
+function showReadingProgress(progress) {
+    textContainer.querySelectorAll(".word").forEach((wordSpan) => {
+        wordSpan.classList.toggle("read", Number(wordSpan.dataset.index) < progress.position);
+    });
+    matchStatus.textContent = `📖 ${Math.round(progress.completion * 100)}% read`;
+}
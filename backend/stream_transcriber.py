@@ -0,0 +1,161 @@
+import re
+import wave
+import numpy as np
+from typing import Dict, List
+
+SAMPLE_RATE = 16000
+
+
+class ReadingTracker:
+    """Follows the reader's position in the document as words are recognized."""
+
+    def __init__(self, document_text: str, lookahead: int = 8):
+        self.document_words = document_text.split()
+        self._normalized = [self._normalize(word) for word in self.document_words]
+        self.lookahead = lookahead
+        self.position = 0
+        self.matched_words = 0
+        self.spoken_words = 0
+
+    @staticmethod
+    def _normalize(word: str) -> str:
+        return re.sub(r'[^\w]', '', word.lower())
+
+    def advance(self, words: List[Dict]) -> None:
+        """Match newly committed words against the document, skipping small gaps."""
+        for word in words:
+            token = self._normalize(word["text"])
+            if not token:
+                continue
+            self.spoken_words += 1
+            window = self._normalized[self.position:self.position + self.lookahead]
+            if token in window:
+                self.position += window.index(token) + 1
+                self.matched_words += 1
+
+    def preceding_text(self, word_count: int = 50) -> str:
+        """Document text just read, used to prompt the next window."""
+        return " ".join(self.document_words[max(0, self.position - word_count):self.position])
+
+    def progress(self) -> Dict:
+        """Reading progress through the document."""
+        total = len(self.document_words)
+        return {
+            "position": self.position,
+            "total_words": total,
+            "matched_words": self.matched_words,
+            "spoken_words": self.spoken_words,
+            "completion": round(self.position / total, 4) if total else 0.0,
+            "match_rate": round(self.matched_words / self.spoken_words, 4) if self.spoken_words else 0.0
+        }
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of a live 16 kHz mono PCM stream.
+    Each pass decodes the audio after the last committed word; words ending
+    well before the end of the buffer are committed and never decoded again.
+    """
+
+    def __init__(self, audio_processor, document_text: str, decode_options: Dict,
+                 step_seconds: float = 3.0, window_seconds: float = 20.0,
+                 commit_margin: float = 2.0, max_seconds: float = 600.0):
+        self.audio_processor = audio_processor
+        self.tracker = ReadingTracker(document_text)
+        self.decode_options = {**decode_options, "temperature": 0.0}
+        self.step_samples = int(step_seconds * SAMPLE_RATE)
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.commit_margin = commit_margin
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self._chunks: List[np.ndarray] = []
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._committed_sample = 0
+        self._decoded_until = 0
+        self.committed_words: List[Dict] = []
+        self.language = decode_options.get("language")
+
+    @property
+    def duration(self) -> float:
+        return self.sample_count / SAMPLE_RATE
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._samples) + sum(len(chunk) for chunk in self._chunks)
+
+    def add_chunk(self, pcm_bytes: bytes) -> bool:
+        """Append 16-bit PCM audio; returns True once enough new audio awaits decoding."""
+        if len(pcm_bytes) % 2:
+            raise ValueError("Audio chunks must contain whole 16-bit samples")
+        if self.sample_count + len(pcm_bytes) // 2 > self.max_samples:
+            raise ValueError("Recording is too long")
+        self._chunks.append(np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0)
+        return self.sample_count - self._decoded_until >= self.step_samples
+
+    def _buffer(self) -> np.ndarray:
+        """Join pending chunks into the sample buffer."""
+        if self._chunks:
+            self._samples = np.concatenate([self._samples, *self._chunks])
+            self._chunks = []
+        return self._samples
+
+    def decode_partial(self, final: bool = False) -> Dict:
+        """Decode the uncommitted tail and return committed plus tentative words."""
+        samples = self._buffer()
+        self._decoded_until = len(samples)
+        region = samples[self._committed_sample:]
+        offset = self._committed_sample / SAMPLE_RATE
+        if len(region) == 0:
+            return self._update([], [])
+
+        options = dict(self.decode_options)
+        prompt = self.tracker.preceding_text()
+        if prompt:
+            options["initial_prompt"] = prompt
+        result = self.audio_processor.transcribe_samples(region, options)
+        self.language = self.language or result.get("language")
+
+        words = [
+            {"text": word["text"], "start": round(word["start"] + offset, 2), "end": round(word["end"] + offset, 2)}
+            for word in result["segments"]
+        ]
+        region_end = len(samples) / SAMPLE_RATE
+        commit_before = region_end if final else region_end - self.commit_margin
+        newly_committed = [word for word in words if word["end"] <= commit_before]
+        tentative = words[len(newly_committed):]
+
+        if newly_committed:
+            self.committed_words.extend(newly_committed)
+            self.tracker.advance(newly_committed)
+            self._committed_sample = int(newly_committed[-1]["end"] * SAMPLE_RATE)
+        elif len(region) > self.window_samples:
+            # Long stretch without words (silence); stop re-decoding it
+            self._committed_sample = len(samples) - int(self.commit_margin * SAMPLE_RATE)
+        return self._update(newly_committed, tentative)
+
+    def _update(self, newly_committed: List[Dict], tentative: List[Dict]) -> Dict:
+        """Message for the client; committed words are sent once and never revised."""
+        return {
+            "committed": newly_committed,
+            "tentative": tentative,
+            "duration": round(self.duration, 2),
+            "progress": self.tracker.progress()
+        }
+
+    def finalize(self, wav_path: str) -> Dict:
+        """Commit the remaining audio, write the stream to WAV and return a transcription result."""
+        self.decode_partial(final=True)
+        samples = self._buffer()
+        with wave.open(wav_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+
+        return {
+            "text": "".join(word["text"] for word in self.committed_words).strip(),
+            "segments": self.committed_words,
+            "language": self.language,
+            "fallback_windows": 0,
+            "wav_path": wav_path,
+            "temp_input_path": None
+        }
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from admission_control import AdmissionController, AdmissionRejected
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_free_slot_is_taken_immediately():
+    async def scenario():
+        admission = AdmissionController()
+        admitted_at = await admission.acquire("user")
+        assert admission.snapshot()["active"] == 1
+        admission.release("user", admitted_at)
+        assert admission.snapshot()["active"] == 0
+    run(scenario())
+
+
+def test_full_queue_is_rejected_with_503():
+    async def scenario():
+        admission = AdmissionController(max_queue=1, max_wait_seconds=5)
+        admitted_at = await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0)
+        assert admission.snapshot()["queued"] == 1
+
+        with pytest.raises(AdmissionRejected) as rejection:
+            await admission.acquire("c")
+        assert rejection.value.status_code == 503
+        assert int(rejection.value.headers()["Retry-After"]) >= 1
+
+        admission.release("a", admitted_at)
+        admission.release("b", await waiter)
+        snapshot = admission.snapshot()
+        assert (snapshot["active"], snapshot["queued"], snapshot["rejected"]) == (0, 0, 1)
+    run(scenario())
+
+
+def test_wait_timeout_frees_the_users_quota():
+    async def scenario():
+        admission = AdmissionController(max_wait_seconds=0.01, per_user_limit=1)
+        admitted_at = await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejection:
+            await admission.acquire("b")
+        assert rejection.value.status_code == 503
+        admission.release("a", admitted_at)
+        admission.release("b", await admission.acquire("b"))
+    run(scenario())
+
+
+def test_per_user_limit():
+    async def scenario():
+        admission = AdmissionController(per_user_limit=1, max_wait_seconds=5)
+        admitted_at = await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejection:
+            await admission.acquire("a")
+        assert rejection.value.status_code == 429
+        admission.release("a", admitted_at)
+    run(scenario())
+
+
+def test_rejected_requests_do_not_spend_the_rate_budget():
+    async def scenario():
+        admission = AdmissionController(max_queue=0, rate_limit=2, per_user_limit=5)
+        admitted_at = await admission.acquire("a")
+        for _ in range(5):
+            with pytest.raises(AdmissionRejected) as rejection:
+                await admission.acquire("b")
+            assert rejection.value.status_code == 503
+        admission.release("a", admitted_at)
+
+        for _ in range(2):
+            admission.release("b", await admission.acquire("b"))
+        with pytest.raises(AdmissionRejected) as rejection:
+            await admission.acquire("b")
+        assert rejection.value.status_code == 429
+    run(scenario())
+
+
+def test_streams_count_toward_quota_and_queue():
+    async def scenario():
+        admission = AdmissionController(per_user_limit=1, max_streams=1)
+        admission.open_stream("a")
+        with pytest.raises(AdmissionRejected) as rejection:
+            await admission.acquire("a")
+        assert rejection.value.status_code == 429
+        with pytest.raises(AdmissionRejected) as rejection:
+            admission.open_stream("b")
+        assert rejection.value.status_code == 503
+
+        admitted_at = await admission.acquire("b")
+        step = asyncio.create_task(admission.acquire_step())
+        await asyncio.sleep(0)
+        snapshot = admission.snapshot()
+        assert snapshot["queued_stream_steps"] == 1
+        assert snapshot["estimated_wait_seconds"] > admission.average_duration()
+
+        admission.release("b", admitted_at)
+        admission.release_step(await step)
+        admission.close_stream("a")
+        snapshot = admission.snapshot()
+        assert (snapshot["active"], snapshot["live_streams"], snapshot["estimated_wait_seconds"]) == (0, 0, 0)
+    run(scenario())
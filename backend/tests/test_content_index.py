@@ -0,0 +1,84 @@
+from content_index import ContentIndex
+
+
+class MemoryRef:
+    """Minimal in-memory stand-in for a Realtime Database reference."""
+
+    def __init__(self, root, path=()):
+        self.root, self.path = root, path
+
+    def child(self, key):
+        return MemoryRef(self.root, self.path + (key,))
+
+    def get(self):
+        node = self.root
+        for key in self.path:
+            if not isinstance(node, dict) or key not in node:
+                return None
+            node = node[key]
+        return node
+
+    def set(self, value):
+        parent = self.root
+        for key in self.path[:-1]:
+            parent = parent.setdefault(key, {})
+        if value is None:
+            parent.pop(self.path[-1], None)
+        else:
+            parent[self.path[-1]] = value
+
+    def update(self, values):
+        self.set({**(self.get() or {}), **values})
+
+    def delete(self):
+        self.set(None)
+
+    def transaction(self, update):
+        value = update(self.get())
+        self.set(value)
+        return value
+
+
+class MemoryStorage:
+    def __init__(self):
+        root = {}
+        self.document_blob_ref = MemoryRef(root, ("document_blobs",))
+        self.audio_blob_ref = MemoryRef(root, ("audio_blobs",))
+
+
+def test_document_blob_is_deleted_with_its_last_reference():
+    storage = MemoryStorage()
+    index = ContentIndex(storage)
+    assert index.register_document("pdf-1", "a", "PDF")
+    assert index.register_document("pdf-1", "b", None)
+
+    index.release_document("pdf-1")
+    assert storage.document_blob_ref.child("pdf-1").get() == {
+        "ref_count": 1, "pdf_content": "PDF", "source_document_id": "b"
+    }
+    index.release_document("pdf-1")
+    assert storage.document_blob_ref.child("pdf-1").get() is None
+
+    # A later upload starts a new blob and must supply the PDF itself
+    assert not index.register_document("pdf-1", "c", None)
+    index.store_document_pdf("pdf-1", "c", "PDF")
+    assert storage.document_blob_ref.child("pdf-1").get() == {
+        "ref_count": 1, "pdf_content": "PDF", "source_document_id": "c"
+    }
+
+
+def test_audio_file_is_removed_with_its_last_reference(tmp_path):
+    storage = MemoryStorage()
+    index = ContentIndex(storage)
+    audio_path = tmp_path / "shared.wav"
+    audio_path.write_bytes(b"RIFF")
+    recording = {"audio_path": str(audio_path), "transcribed_text": "hi", "word_timings": []}
+    index.register_audio("audio-1", recording, "en")
+    index.register_audio("audio-1", recording, "en")
+
+    index.release_audio("audio-1", str(audio_path))
+    assert audio_path.exists()
+    assert index.find_audio("audio-1")["text"] == "hi"
+    index.release_audio("audio-1", str(audio_path))
+    assert not audio_path.exists()
+    assert storage.audio_blob_ref.child("audio-1").get() is None
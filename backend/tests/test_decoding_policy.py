@@ -0,0 +1,24 @@
+from decoding_policy import DecodingPolicy
+
+
+def test_prompt_keeps_the_passage_start_within_the_token_budget():
+    policy = DecodingPolicy(prompt_tokens=40)
+    passage = policy.locate_passage(" ".join(f"прочитанное{index}" for index in range(200)))
+    words = passage.split()
+    assert words[0] == "прочитанное0"
+    assert sum(policy._count_tokens(" " + word) for word in words) <= 40
+
+
+def test_passage_resumes_after_previous_recording():
+    policy = DecodingPolicy(resume_match_words=3)
+    text = "one two three four five six seven"
+    assert policy.locate_passage(text, "Two, three four!").split()[0] == "five"
+    assert policy.locate_passage(text, "unrelated words here").split()[0] == "one"
+
+
+def test_options_carry_language_and_prompt():
+    options = DecodingPolicy(beam_size=5).build_options("some text", "ru")
+    assert options["language"] == "ru"
+    assert options["beam_size"] == 5
+    assert options["initial_prompt"] == "some text"
+    assert "best_of" not in options
@@ -0,0 +1,57 @@
+import base64
+import io
+import json
+import zipfile
+from export_archive import stream_archive
+
+
+class MemoryStorage:
+    """Just the reads stream_archive makes, over in-memory documents."""
+
+    def __init__(self, documents, recordings):
+        self.documents = documents
+        self.recordings = recordings
+
+    def fetch_document_fields(self, doc_id, fields):
+        if doc_id not in self.documents:
+            raise ValueError("Document not found")
+        return {field: self.documents[doc_id][field] for field in fields if field in self.documents[doc_id]}
+
+    def all_recording_summaries(self, doc_id):
+        return {rec_id: {} for rec_id, recording in self.recordings.items() if recording["document_id"] == doc_id}
+
+    def fetch_recording(self, doc_id, recording_id):
+        recording = self.recordings.get(recording_id)
+        if not recording or recording["document_id"] != doc_id:
+            raise ValueError("Recording not found")
+        return recording
+
+
+def build_archive(storage, document_ids, nested=False):
+    return zipfile.ZipFile(io.BytesIO(b"".join(stream_archive(storage, document_ids, nested))))
+
+
+def test_archive_contains_document_audio_and_transcripts(tmp_path):
+    audio_path = tmp_path / "a.wav"
+    audio_path.write_bytes(b"RIFF" + b"\0" * 100)
+    storage = MemoryStorage(
+        {"d1": {"pdf_content": base64.b64encode(b"%PDF-1.4").decode(), "text_content": "hello"}},
+        {"r1": {"document_id": "d1", "audio_path": str(audio_path), "uploader_id": "u1",
+                "transcribed_text": "hello", "word_timings": [{"text": " hello", "start": 0.0, "end": 0.5}]}}
+    )
+
+    archive = build_archive(storage, ["d1"])
+    assert archive.testzip() is None
+    assert archive.read("document.pdf") == b"%PDF-1.4"
+    assert archive.read("document.txt") == b"hello"
+    assert archive.read("audio/r1.wav") == audio_path.read_bytes()
+    assert json.loads(archive.read("transcripts/r1.json"))["uploader_id"] == "u1"
+    assert "r1,u1" in archive.read("recordings.csv").decode()
+
+
+def test_documents_deleted_during_export_are_skipped():
+    storage = MemoryStorage({"kept": {"text_content": "still here"}}, {})
+
+    archive = build_archive(storage, ["deleted", "kept"], nested=True)
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == ["kept/document.txt", "kept/recordings.csv"]
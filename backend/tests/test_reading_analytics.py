@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("firebase_admin")
+
+from reading_analytics import _merge, recording_metrics, summarize
+
+DAY = 1760000000.0
+
+
+def timings(*spans):
+    return [{"text": f" w{index}", "start": start, "end": end} for index, (start, end) in enumerate(spans)]
+
+
+def test_recording_metrics_counts_pauses():
+    metrics = recording_metrics(timings((0.0, 0.4), (0.5, 1.0), (1.6, 2.0), (4.5, 5.0)), True)
+    assert metrics["words"] == 4
+    assert metrics["speaking_seconds"] == 5.0
+    assert metrics["words_per_minute"] == 48.0
+    assert metrics["pauses"] == 2
+    assert metrics["long_pauses"] == 1
+    assert metrics["pause_seconds"] == 3.1
+    assert metrics["content_match"] is True
+
+
+def test_recording_metrics_without_words():
+    metrics = recording_metrics([], False)
+    assert metrics["words"] == 0
+    assert metrics["words_per_minute"] == 0.0
+    assert metrics["content_match"] is False
+
+
+def test_merge_then_remove_restores_the_aggregate():
+    first = recording_metrics(timings((0.0, 1.0), (3.0, 4.0)), True)
+    second = recording_metrics(timings((0.0, 0.5), (0.6, 1.0)), False)
+
+    aggregate = _merge(None, first, DAY)
+    aggregate = _merge(aggregate, second, DAY + 86400)
+    assert aggregate["recordings"] == 2
+    assert aggregate["matched_recordings"] == 1
+    assert len(aggregate["daily"]) == 2
+
+    aggregate = _merge(aggregate, second, DAY + 86400, sign=-1)
+    assert aggregate["recordings"] == 1
+    assert aggregate["words"] == first["words"]
+    assert aggregate["pauses"] == first["pauses"]
+    assert len(aggregate["daily"]) == 1
+    assert aggregate["last_recording_at"] == DAY + 86400
+
+
+def test_summarize_derives_rates():
+    aggregate = _merge(None, recording_metrics(timings((0.0, 30.0), (30.0, 60.0)), True), DAY)
+    aggregate = _merge(aggregate, recording_metrics(timings((0.0, 60.0)), False), DAY)
+    summary = summarize(aggregate)
+    assert summary["recordings"] == 2
+    assert summary["words_per_minute"] == 1.5
+    assert summary["match_rate"] == 0.5
+    assert list(summary["daily"].values())[0]["recordings"] == 2
+    assert summarize(None)["recordings"] == 0
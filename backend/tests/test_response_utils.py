@@ -0,0 +1,39 @@
+import gzip
+import json
+from starlette.requests import Request
+from response_utils import COMPRESSION_MIN_BYTES, etag_matches, json_response, revision_headers
+
+
+def make_request(**headers):
+    raw_headers = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+
+
+def test_etag_matches_uses_weak_comparison():
+    etag = revision_headers({"etag": "abc", "updated_at": 1700000000})["ETag"]
+    assert etag == 'W/"abc"'
+    assert etag_matches(make_request(if_none_match='W/"abc"'), etag)
+    assert etag_matches(make_request(if_none_match='"abc"'), etag)
+    assert etag_matches(make_request(if_none_match='"other", W/"abc"'), etag)
+    assert etag_matches(make_request(if_none_match="*"), etag)
+    assert not etag_matches(make_request(if_none_match='"other"'), etag)
+    assert not etag_matches(make_request(), etag)
+
+
+def test_unversioned_records_have_no_validators():
+    assert revision_headers(None) == {}
+    assert not etag_matches(make_request(if_none_match="*"), None)
+
+
+def test_only_large_responses_are_compressed():
+    request = make_request(accept_encoding="gzip")
+    small = json_response(request, {"text": "x"})
+    assert "content-encoding" not in small.headers
+
+    payload = {"text": "x" * COMPRESSION_MIN_BYTES}
+    large = json_response(request, payload)
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(large.body)) == payload
+
+    assert "content-encoding" not in json_response(make_request(), payload).headers
@@ -0,0 +1,180 @@
+import itertools
+import math
+import random
+import time
+
+import pytest
+
+from search_index import SearchIndex
+
+
+def ids(results):
+    return [result["document_id"] for result in results]
+
+
+def test_bm25_ranks_more_specific_matches_first():
+    index = SearchIndex()
+    index.add_document("a", "the cat sat on the mat", "u1")
+    index.add_document("b", "the dog chased the cat and the cat ran", "u2")
+    index.add_document("c", "a story about a dog", "u1")
+
+    assert ids(index.search("cat"))[0] == "b"
+    assert set(ids(index.search("dog"))) == {"b", "c"}
+    assert ids(index.search("cat", user_id="u1")) == ["a"]
+    assert index.search("") == []
+
+
+def test_prefix_matches_score_below_exact_terms():
+    index = SearchIndex()
+    index.add_document("exact", "read", None)
+    index.add_document("prefix", "reading", None)
+
+    assert ids(index.search("read")) == ["exact", "prefix"]
+    assert ids(index.search("read", prefix=False)) == ["exact"]
+    assert ids(index.search("readi")) == ["prefix"]
+
+
+def test_replace_and_remove_update_postings():
+    index = SearchIndex()
+    index.add_document("a", "alpha beta", None)
+    index.add_document("a", "gamma", None)
+    assert index.search("alpha") == []
+    assert ids(index.search("gamma")) == ["a"]
+
+    index.remove_document("a")
+    assert len(index) == 0
+    assert index.search("gamma") == []
+    assert index._sorted_terms == []
+
+
+def test_journal_is_replayed_after_restart(tmp_path):
+    path = str(tmp_path / "index.pkl")
+    index = SearchIndex(index_path=path)
+    index.add_document("a", "alpha", None)
+    index.save()
+    index.add_document("b", "beta", None)
+    index.remove_document("a")
+
+    restored = SearchIndex(index_path=path)
+    assert restored.load()
+    assert ids(restored.search("beta")) == ["b"]
+    assert restored.search("alpha") == []
+
+
+def test_workers_see_each_others_changes(tmp_path):
+    path = str(tmp_path / "index.pkl")
+    first, second = SearchIndex(index_path=path), SearchIndex(index_path=path)
+    first.add_document("a", "alpha", None)
+    assert ids(second.search("alpha")) == ["a"]
+
+    second.save()
+    first.add_document("b", "alpha beta", None)
+    assert set(ids(second.search("alpha"))) == {"a", "b"}
+    assert set(ids(first.search("alpha"))) == {"a", "b"}
+
+
+def test_torn_journal_entry_is_cut_off(tmp_path):
+    path = str(tmp_path / "index.pkl")
+    index = SearchIndex(index_path=path)
+    index.add_document("a", "zebra", None)
+    with open(f"{path}.journal", "ab") as journal_file:
+        journal_file.write(b"\x80\x05torn")
+    SearchIndex(index_path=path).add_document("b", "zebra", None)
+
+    restored = SearchIndex(index_path=path)
+    restored.load()
+    assert set(ids(restored.search("zebra"))) == {"a", "b"}
+
+
+def test_unreadable_snapshot_is_rebuilt(tmp_path):
+    path = str(tmp_path / "index.pkl")
+    with open(path, "wb") as index_file:
+        index_file.write(b"not a snapshot")
+
+    index = SearchIndex(index_path=path)
+    assert not index.load()
+    index.load_or_rebuild(lambda: {"a": {"text_content": "alpha", "user_id": "u1"}})
+    assert ids(index.search("alpha")) == ["a"]
+    assert SearchIndex(index_path=path).load()
+
+
+def test_changes_during_rebuild_are_kept(tmp_path):
+    index = SearchIndex(index_path=str(tmp_path / "index.pkl"))
+    index.add_document("old", "alpha", None)
+
+    def load_documents():
+        # Uploads and deletions while the corpus is being read
+        index.add_document("late", "alpha late", None)
+        index.remove_document("old")
+        return {"old": {"text_content": "alpha"}, "kept": {"text_content": "alpha kept"}}
+
+    index.rebuild(load_documents)
+    assert set(ids(index.search("alpha"))) == {"late", "kept"}
+
+
+def brute_force_scores(index, query, limit=10):
+    doc_count = len(index._doc_lengths)
+    average_length = index._total_length / doc_count
+    scores = {}
+    for query_term in index.tokenize(query):
+        for term in index._expand_term(query_term, True):
+            postings = index._postings[term]
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf if term == query_term else idf * 0.5
+            for doc_id, frequency in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * index._term_score(
+                    frequency, index._doc_lengths[doc_id], average_length
+                )
+    return [round(score, 4) for score in sorted(scores.values(), reverse=True)[:limit]]
+
+
+def zipf_corpus(doc_count, words_per_doc, vocabulary_size=20000, seed=7):
+    generator = random.Random(seed)
+    vocabulary = [f"w{rank}" for rank in range(vocabulary_size)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary_size)))
+    return {
+        f"d{number}": {
+            "text_content": " ".join(["the", "of", "the", "and"] + generator.choices(
+                vocabulary, cum_weights=cumulative, k=words_per_doc - 4
+            )),
+            "user_id": f"u{number % 100}"
+        }
+        for number in range(doc_count)
+    }
+
+
+def test_pruned_search_matches_full_scoring():
+    index = SearchIndex(max_scan_postings=50)
+    for doc_id, doc_data in zipf_corpus(2000, 30, vocabulary_size=500).items():
+        index.add_document(doc_id, doc_data["text_content"], doc_data["user_id"])
+    queries = ["the", "w1 the of", "w3 w4", "w10 w20 w30", "w12", "w250 w499"]
+    for query in queries:
+        assert [result["score"] for result in index.search(query)] == brute_force_scores(index, query)
+
+    # Cached impact lists follow later changes
+    for number in range(0, 2000, 7):
+        index.remove_document(f"d{number}")
+    index.add_document("new", "the the the w1 w1 w3", None)
+    for query in queries:
+        assert [result["score"] for result in index.search(query)] == brute_force_scores(index, query)
+    assert all(result["user_id"] == "u3" for result in index.search("the w1", user_id="u3"))
+
+
+@pytest.fixture(scope="module")
+def large_index():
+    index = SearchIndex()
+    index.rebuild(lambda: zipf_corpus(100_000, 60))
+    return index
+
+
+@pytest.mark.parametrize("query", ["the", "w1 the of", "w500 w7000"])
+def test_common_terms_are_fast_on_a_large_corpus(large_index, query):
+    large_index.search(query)  # Builds the impact lists
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        results = large_index.search(query)
+        timings.append(time.perf_counter() - started)
+
+    assert min(timings) < 0.05
+    assert [result["score"] for result in results] == brute_force_scores(large_index, query)
@@ -0,0 +1,104 @@
+import wave
+
+import numpy as np
+import pytest
+
+from stream_transcriber import SAMPLE_RATE, ReadingTracker, StreamingTranscriber
+
+
+class StubProcessor:
+    """Returns preset words, with times relative to the decoded region."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def transcribe_samples(self, samples, decode_options):
+        self.calls.append((len(samples), decode_options))
+        segments = self.responses.pop(0) if self.responses else []
+        return {"text": "".join(word["text"] for word in segments), "segments": segments, "language": "en"}
+
+
+def word(text, start, end):
+    return {"text": text, "start": start, "end": end}
+
+
+def pcm(seconds, amplitude=0.1):
+    samples = np.full(int(seconds * SAMPLE_RATE), amplitude * 32767, dtype=np.int16)
+    return samples.tobytes()
+
+
+def test_words_near_the_end_stay_tentative():
+    processor = StubProcessor(
+        [word(" the", 0.2, 1.0), word(" quick", 1.2, 2.5), word(" brown", 3.5, 4.5)],
+        [word(" brown", 0.6, 1.5), word(" fox", 1.8, 2.4)]
+    )
+    transcriber = StreamingTranscriber(processor, "The quick brown fox", {"language": "en"},
+                                       step_seconds=3.0, commit_margin=2.0)
+    assert not transcriber.add_chunk(pcm(2))
+    assert transcriber.add_chunk(pcm(3))
+
+    update = transcriber.decode_partial()
+    assert [w["text"] for w in update["committed"]] == [" the", " quick"]
+    assert [w["text"] for w in update["tentative"]] == [" brown"]
+    assert update["progress"]["position"] == 2
+    assert processor.calls[0][1] == {"language": "en", "temperature": 0.0}
+
+    # Only the audio after the last committed word is decoded again
+    transcriber.add_chunk(pcm(3))
+    update = transcriber.decode_partial(final=True)
+    assert processor.calls[1][0] == 8 * SAMPLE_RATE - int(2.5 * SAMPLE_RATE)
+    assert processor.calls[1][1]["initial_prompt"] == "The quick"
+    assert update["committed"] == [word(" brown", 3.1, 4.0), word(" fox", 4.3, 4.9)]
+    assert update["tentative"] == []
+    assert update["progress"]["completion"] == 1.0
+
+
+def test_long_silence_is_not_decoded_again():
+    processor = StubProcessor()
+    transcriber = StreamingTranscriber(processor, "hello", {}, window_seconds=4.0, commit_margin=1.0)
+    transcriber.add_chunk(pcm(3, amplitude=0.0))
+    transcriber.decode_partial()
+    transcriber.add_chunk(pcm(3, amplitude=0.0))
+    transcriber.decode_partial()
+    transcriber.add_chunk(pcm(1, amplitude=0.0))
+    transcriber.decode_partial()
+
+    # The second pass covered more than a window, so all but the margin was skipped
+    assert [length for length, _ in processor.calls] == [3 * SAMPLE_RATE, 6 * SAMPLE_RATE, 2 * SAMPLE_RATE]
+
+
+def test_finalize_writes_the_stream_as_wav(tmp_path):
+    processor = StubProcessor([word(" hello", 0.1, 0.6), word(" world", 0.7, 1.1)])
+    transcriber = StreamingTranscriber(processor, "hello world", {})
+    transcriber.add_chunk(pcm(1.5))
+
+    wav_path = str(tmp_path / "stream.wav")
+    result = transcriber.finalize(wav_path)
+    assert result["text"] == "hello world"
+    assert [w["text"] for w in result["segments"]] == [" hello", " world"]
+    assert result["language"] == "en"
+    assert result["wav_path"] == wav_path
+    with wave.open(wav_path, "rb") as wav_file:
+        assert wav_file.getnchannels() == 1
+        assert wav_file.getsampwidth() == 2
+        assert wav_file.getframerate() == SAMPLE_RATE
+        assert wav_file.getnframes() == int(1.5 * SAMPLE_RATE)
+
+
+def test_chunks_are_validated():
+    transcriber = StreamingTranscriber(StubProcessor(), "", {}, max_seconds=1.0)
+    with pytest.raises(ValueError):
+        transcriber.add_chunk(b"\x00")
+    with pytest.raises(ValueError):
+        transcriber.add_chunk(pcm(1.5))
+
+
+def test_tracker_skips_words_outside_the_lookahead():
+    tracker = ReadingTracker("One, two three four.", lookahead=2)
+    tracker.advance([{"text": " one"}, {"text": " um"}, {"text": " four"}, {"text": " two"}])
+    assert tracker.progress() == {
+        "position": 2, "total_words": 4, "matched_words": 2,
+        "spoken_words": 4, "completion": 0.5, "match_rate": 0.5
+    }
+    assert tracker.preceding_text() == "One, two"
@@ -1,4 +1,4 @@
-import os
+import io
 import logging
 import uuid
 import requests
@@ -12,7 +12,7 @@ from telegram.ext import (
     filters,
     ContextTypes,
 )
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from telegram.request import HTTPXRequest
 
@@ -25,10 +25,37 @@ logger = logging.getLogger(__name__)
 # Backend API configuration
 API_BASE_URL = "http://localhost:8000"  # Update with your FastAPI server URL
 AUDIO_STORAGE_PATH = "static/audiorecordings"
+MAX_TELEGRAM_FILE_SIZE = 50 * 1024 * 1024  # Bot API upload limit
 
 # User states to track voice message context
 user_states: Dict[int, Dict] = {}
 
+# Document responses cached by (document_id, fields) and revalidated with ETags
+document_cache: Dict[Tuple[str, str], Tuple[str, Dict]] = {}
+DOCUMENT_CACHE_SIZE = 100
+
+# Cursors for recording pages keyed by (document_id, page); page 1 needs no cursor
+recording_cursors: Dict[Tuple[str, int], str] = {}
+
+def fetch_document(document_id: str, fields: str) -> Tuple[int, Dict]:
+    """Fetch selected document fields, reusing the cached copy when it is unchanged."""
+    cache_key = (document_id, fields)
+    cached = document_cache.get(cache_key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(
+        f"{API_BASE_URL}/documents/{document_id}", params={"fields": fields}, headers=headers
+    )
+
+    if response.status_code == 304 and cached:
+        return 200, cached[1]
+
+    data = response.json()
+    if response.status_code == 200 and response.headers.get("ETag"):
+        if len(document_cache) >= DOCUMENT_CACHE_SIZE:
+            document_cache.pop(next(iter(document_cache)))
+        document_cache[cache_key] = (response.headers["ETag"], data)
+    return response.status_code, data
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /start command."""
     user = update.effective_user
@@ -39,6 +66,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "Use these commands:\n"
         "📤 /upload - Upload a PDF/TXT file or send text\n"
         "📜 /list - Browse available texts\n"
+        "🔍 /search <words> - Find texts by content\n"
         "📊 /status - Check processing status"
     )
 
@@ -52,13 +80,64 @@ async def list_texts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     """Handle /list command."""
     await fetch_and_display_texts(update, context, page=1)
 
+async def search_texts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /search command."""
+    query_text = " ".join(context.args or []).strip()
+    if not query_text:
+        await update.message.reply_text("🔍 Usage: /search <words from the text>")
+        return
+
+    msg = await update.message.reply_text("⏳ Searching...")
+    try:
+        params = {"query": query_text, "limit": 5}
+        response = requests.get(f"{API_BASE_URL}/documents/search", params=params)
+
+        if response.status_code != 200:
+            await msg.edit_text(f"❌ Search failed: {response.json()['detail']}")
+            return
+
+        documents = response.json()["documents"]
+        if not documents:
+            await msg.edit_text(f"📭 No texts found for \"{query_text}\".")
+            return
+
+        keyboard = []
+        for doc in documents:
+            preview = doc["preview"][:30] + "..." if len(doc["preview"]) > 30 else doc["preview"]
+            callback_data = f"td:{doc['document_id']}:1:1"
+            if len(callback_data.encode('utf-8')) > 64:
+                logger.warning(f"Callback data too long: {callback_data}")
+                continue
+            keyboard.append([InlineKeyboardButton(f"📖 {preview}", callback_data=callback_data)])
+
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        await msg.edit_text(f"🔍 Results for \"{query_text}\":", reply_markup=reply_markup)
+
+    except Exception as e:
+        await msg.edit_text(f"❌ Search failed. Please try again.\nError: {str(e)}")
+
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /status command."""
-    # Placeholder for background task count (not implemented in backend)
-    await update.message.reply_text(
-        "📊 Status: No ongoing audio processing tasks.\n"
-        "All tasks run in the background."
-    )
+    try:
+        response = requests.get(f"{API_BASE_URL}/status/transcription")
+        if response.status_code != 200:
+            await update.message.reply_text(f"❌ Failed to fetch status: {response.json()['detail']}")
+            return
+
+        load = response.json()
+        await update.message.reply_text(
+            f"📊 Status: {load['active']} recording(s) processing, {load['queued']} waiting.\n"
+            f"⏱ Estimated wait for a new recording: {format_wait(load['estimated_wait_seconds'])}"
+        )
+    except Exception as e:
+        await update.message.reply_text(f"❌ Failed to fetch status.\nError: {str(e)}")
+
+def format_wait(seconds: float) -> str:
+    """Format a wait estimate for display."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    return f"{(seconds + 59) // 60} min"
 
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle document uploads (PDF/TXT)."""
@@ -128,6 +207,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         return
 
     document_id = state["document_id"]
+    keep_state = False
     msg = await update.message.reply_text("⏳ Downloading...")
 
     try:
@@ -148,6 +228,14 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                 f"Document ID: {result['document_id']}\n"
                 f"Recording ID: {result['recording_id']}"
             )
+        elif response.status_code in (429, 503):
+            # Server is at capacity; keep the state so the user can resend
+            keep_state = True
+            retry_after = float(response.headers.get("Retry-After", 0))
+            await msg.edit_text(
+                f"⏳ {response.json()['detail']}.\n"
+                f"Estimated wait: {format_wait(retry_after)}. Please send the recording again then."
+            )
         else:
             await msg.edit_text(
                 f"❌ Failed to process recording: {response.json()['detail']}"
@@ -158,7 +246,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         )
     finally:
         # Clear state
-        if user_id in user_states:
+        if not keep_state and user_id in user_states:
             del user_states[user_id]
 
 async def fetch_and_display_texts(
@@ -196,7 +284,7 @@ async def fetch_and_display_texts(
             preview = (
                 doc["text_content"][:30] + "..." if len(doc["text_content"]) > 30 else doc["text_content"]
             )
-            recordings_count = len(doc.get("audio_recordings", {}))
+            recordings_count = doc.get("recording_count", 0)
             button_text = (
                 f"📖 {preview} ({recordings_count} recording{'s' if recordings_count != 1 else ''})"
             )
@@ -246,22 +334,37 @@ async def text_detail(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
 
     try:
-        response = requests.get(f"{API_BASE_URL}/documents/{document_id}")
-        if response.status_code != 200:
-            await query.message.edit_text(f"❌ Text not found: {response.json()['detail']}")
+        status_code, doc = fetch_document(document_id, "text_content,user_id")
+        if status_code != 200:
+            await query.message.edit_text(f"❌ Text not found: {doc['detail']}")
             return
 
-        doc = response.json()
         preview = (
             doc["text_content"][:200] + "..." if len(doc["text_content"]) > 200 else doc["text_content"]
         )
-        recordings = list(doc.get("audio_recordings", {}).items())
-        total_recording_pages = (len(recordings) + 4) // 5  # Ceiling division
+
+        # Fetch one page of recording summaries; restart from page 1 if its cursor is unknown
+        if (document_id, recordings_page) not in recording_cursors:
+            recordings_page = 1
+        params = {"limit": 5}
+        if recordings_page > 1:
+            params["cursor"] = recording_cursors[(document_id, recordings_page)]
+        response = requests.get(f"{API_BASE_URL}/documents/{document_id}/recordings", params=params)
+        if response.status_code != 200:
+            await query.message.edit_text(f"❌ Failed to fetch recordings: {response.json()['detail']}")
+            return
+
+        recordings_data = response.json()
+        recordings = recordings_data["recordings"]
+        total_recordings = recordings_data["total_recordings"]
+        total_recording_pages = (total_recordings + 4) // 5  # Ceiling division
+        if recordings_data["next_cursor"]:
+            recording_cursors[(document_id, recordings_page + 1)] = recordings_data["next_cursor"]
 
         text = (
             f"📝 Text Details\n\n"
             f"Uploader ID: {doc['user_id']}\n"
-            f"Recordings: {len(recordings)} (Page {recordings_page}/{max(1, total_recording_pages)})\n"
+            f"Recordings: {total_recordings} (Page {recordings_page}/{max(1, total_recording_pages)})\n"
             f"Preview: {preview}"
         )
 
@@ -270,15 +373,18 @@ async def text_detail(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
                 InlineKeyboardButton(
                     "📥 Download Text",
                     callback_data=f"dt:{document_id}",
+                ),
+                InlineKeyboardButton(
+                    "📦 Export All",
+                    callback_data=f"ex:{document_id}",
                 )
             ]
         ]
 
         # Add recording buttons (paginated)
         start_idx = (recordings_page - 1) * 5
-        end_idx = start_idx + 5
-        for idx, (rec_id, rec) in enumerate(recordings[start_idx:end_idx], start=start_idx + 1):
-            callback_data = f"rd:{document_id}:{rec_id}:{list_page}:{recordings_page}"
+        for idx, rec in enumerate(recordings, start=start_idx + 1):
+            callback_data = f"rd:{document_id}:{rec['recording_id']}:{list_page}:{recordings_page}"
             if len(callback_data.encode('utf-8')) > 64:
                 logger.warning(f"Callback data too long for recording: {callback_data}")
                 continue  # Skip this button to avoid errors
@@ -300,7 +406,7 @@ async def text_detail(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
                     callback_data=f"td:{document_id}:{list_page}:{recordings_page-1}",
                 )
             )
-        if recordings_page < total_recording_pages:
+        if recordings_data["next_cursor"]:
             nav_buttons.append(
                 InlineKeyboardButton(
                     "Next ➡️",
@@ -318,6 +424,12 @@ async def text_detail(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
                     callback_data=f"ar:{document_id}",
                 )
             ],
+            [
+                InlineKeyboardButton(
+                    "🎙 Read Live in Mini App",
+                    web_app={"url": f"#ngrok here#/static/telegram_miniapp.html?document_id={document_id}&mode=live"},
+                )
+            ],
             [
                 InlineKeyboardButton(
                     "🔙 Back to Texts",
@@ -412,31 +524,59 @@ async def download_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
 
     try:
-        response = requests.get(f"{API_BASE_URL}/documents/{document_id}")
-        if response.status_code != 200:
-            await query.message.edit_text(f"❌ Text not found: {response.json()['detail']}")
+        status_code, doc = fetch_document(document_id, "text_content")
+        if status_code != 200:
+            await query.message.edit_text(f"❌ Text not found: {doc['detail']}")
             return
 
-        doc = response.json()
-        text_content = doc["text_content"]
         file_name = f"text_{document_id}.txt"
 
-        # Save text to a temporary file
-        temp_file = f"/tmp/{file_name}"
-        with open(temp_file, "w") as f:
-            f.write(text_content)
-
+        # Send straight from memory; no temporary file is written
         await query.message.reply_document(
-            document=open(temp_file, "rb"),
+            document=io.BytesIO(doc["text_content"].encode("utf-8")),
             filename=file_name,
         )
-        os.remove(temp_file)
 
     except Exception as e:
         await query.message.edit_text(f"❌ Failed to download text.\nError: {str(e)}")
 
     await query.answer()
 
+async def export_archive(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Send a ZIP export of a text with all its recordings."""
+    query = update.callback_query
+    try:
+        _, document_id = query.data.split(":")
+    except ValueError as e:
+        await query.message.edit_text(f"❌ Invalid button data. Please try again.\nError: {str(e)}")
+        await query.answer()
+        return
+
+    try:
+        response = requests.get(f"{API_BASE_URL}/documents/{document_id}/export", stream=True)
+        if response.status_code != 200:
+            await query.message.edit_text(f"❌ Export failed: {response.json()['detail']}")
+            return
+
+        # Collect the streamed archive in memory and upload it from there
+        archive = io.BytesIO()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            archive.write(chunk)
+            if archive.tell() > MAX_TELEGRAM_FILE_SIZE:
+                response.close()
+                await query.message.reply_text(
+                    f"❌ The archive is too large for Telegram. Download it from {API_BASE_URL}/documents/{document_id}/export"
+                )
+                return
+        archive.seek(0)
+
+        await query.message.reply_document(document=archive, filename=f"document_{document_id}.zip")
+
+    except Exception as e:
+        await query.message.edit_text(f"❌ Failed to export text.\nError: {str(e)}")
+
+    await query.answer()
+
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle all button callbacks."""
     query = update.callback_query
@@ -453,6 +593,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await add_recording(update, context)
     elif data.startswith("dt:"):
         await download_text(update, context)
+    elif data.startswith("ex:"):
+        await export_archive(update, context)
 
     await query.answer()
 
@@ -475,6 +617,7 @@ def main() -> None:
     application.add_handler(CommandHandler("upload", upload))
     application.add_handler(CommandHandler("list", list_texts))
     application.add_handler(CommandHandler("status", status))
+    application.add_handler(CommandHandler("search", search_texts))
 
     # Message handlers
     application.add_handler(MessageHandler(filters.Document.ALL, handle_document))